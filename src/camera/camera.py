@@ -3,6 +3,7 @@ import numpy as np
 
 class Camera:
   def __init__(self, width: float, height: float, fov: float, far: float, near: float):
+    self.version = 0  # Bumped whenever the view or the projection changes
     self.CameraMatrix = transformation.getDefaultMatrix()
     self.position = np.array([0.0, 0.0, 0.0])
     self.rotation = np.array([0.0, 0.0, 0.0])  # [pitch, yaw, roll] in degrees
@@ -14,9 +15,66 @@ class Camera:
     self.aspectRatio = width / height
     self.updateCameraMatrix()
 
+  # Projection parameters are properties so that the cached projection matrix
+  # is rebuilt only when one of them actually changes
+  @property
+  def fov(self) -> float:
+    return self._fov
+
+  @fov.setter
+  def fov(self, value: float):
+    self._fov = value
+    self._invalidateProjection()
+
+  @property
+  def near(self) -> float:
+    return self._near
+
+  @near.setter
+  def near(self, value: float):
+    self._near = value
+    self._invalidateProjection()
+
+  @property
+  def far(self) -> float:
+    return self._far
+
+  @far.setter
+  def far(self, value: float):
+    self._far = value
+    self._invalidateProjection()
+
+  @property
+  def aspectRatio(self) -> float:
+    return self._aspectRatio
+
+  @aspectRatio.setter
+  def aspectRatio(self, value: float):
+    self._aspectRatio = value
+    self._invalidateProjection()
+
+  def _invalidateProjection(self):
+    self._projectionMatrix = None
+    self._viewProjectionMatrix = None
+    self.version += 1
+
+  def getProjectionMatrix(self) -> np.ndarray:
+    """Perspective projection matrix, rebuilt only after fov/near/far/aspectRatio change"""
+    if self._projectionMatrix is None:
+      self._projectionMatrix = transformation.getPerspectiveMatrix(self.fov, self.aspectRatio, self.near, self.far)
+    return self._projectionMatrix
+
+  def getViewProjectionMatrix(self) -> np.ndarray:
+    """Combined projection @ view matrix, rebuilt only after the camera or projection changes"""
+    if self._viewProjectionMatrix is None:
+      self._viewProjectionMatrix = self.getProjectionMatrix() @ self.CameraMatrix
+    return self._viewProjectionMatrix
+
   def updateCameraMatrix(self):
     """Updates the camera matrix based on position and rotation"""
     self.CameraMatrix = transformation.getViewMatrix(self.position, self.rotation)
+    self._viewProjectionMatrix = None
+    self.version += 1
 
   def translate(self, translationVector: tuple[float, float, float]):
     """Translate in camera's local space"""
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import struct
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Bump whenever the layout below or the way trees are built changes, old files are then ignored
+FORMAT_VERSION = 2
+MAGIC = b"BSPC"
+
+# Every array starts at a multiple of this many bytes so memory-mapped views are aligned
+ALIGNMENT = 64
+
+# Trees kept in a cache directory; the least recently used ones are removed beyond this
+MAX_ENTRIES = 16
+
+# magic, format version, scene key (sha256), then the counts and tree statistics below
+HEADER = struct.Struct("<4sI32s8Q")
+COUNTS = ("node_count", "tree_face_count", "face_count", "id_count", "vertex_count",
+          "total_faces", "split_count", "depth")
+
+# Arrays stored in the file, in order: (name, dtype, shape as count names or ints)
+ARRAYS = (
+    ("node_planes", np.float64, ("node_count", 4)),
+    ("node_front", np.int32, ("node_count",)),
+    ("node_back", np.int32, ("node_count",)),
+    ("node_polygons", np.int32, ("node_count",)),
+    ("tree_faces", np.int64, ("tree_face_count",)),   # Face table row of every tree polygon
+    ("face_planes", np.float64, ("face_count", 4)),
+    ("face_colors", np.uint8, ("face_count", 3)),
+    ("face_offsets", np.int64, ("face_count",)),
+    ("face_sizes", np.int64, ("face_count",)),
+    ("face_parents", np.int64, ("face_count",)),      # Index of the owning object in the scene
+    ("vertex_ids", np.int64, ("id_count",)),
+    ("vertices", np.float64, ("vertex_count", 4)),
+)
+
+def scene_key(objects: List, params: Tuple) -> bytes:
+    """
+    Content hash of a scene for the tree cache
+
+    Objects that share a mesh (scene instances) are hashed by mesh key and
+    model matrix, anything else by its world-space vertices. `params` holds
+    whatever else changes the tree, such as the partition strategy.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((FORMAT_VERSION, params, len(objects))).encode())
+    for obj in objects:
+        digest.update(type(getattr(obj, 'mesh', obj)).__name__.encode())
+        if hasattr(obj, 'getMeshKey'):
+            digest.update(repr(obj.getMeshKey()).encode())
+        if hasattr(obj, 'modelMatrix'):
+            digest.update(np.ascontiguousarray(obj.modelMatrix, dtype=np.float64).tobytes())
+        else:
+            digest.update(np.ascontiguousarray(obj.vertices, dtype=np.float64).tobytes())
+    return digest.digest()
+
+# Index arrays and the range their values must lie in: (name, low, count name the values stay below)
+INDEX_RANGES = (
+    ("node_front", -1, "node_count"),
+    ("node_back", -1, "node_count"),
+    ("node_polygons", -1, "tree_face_count"),
+    ("tree_faces", 0, "face_count"),
+    ("face_offsets", 0, "id_count"),
+    ("vertex_ids", 0, "vertex_count"),
+)
+
+def cache_path(cache_dir: str, key: bytes) -> str:
+    return os.path.join(cache_dir, key.hex()[:32] + ".bsp")
+
+def prune(cache_dir: str, max_entries: int = MAX_ENTRIES):
+    """Remove all but the `max_entries` most recently used trees (by modification time) from `cache_dir`"""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".bsp") and entry.is_file():
+            entries.append((entry.stat().st_mtime, entry.path))
+    entries.sort(reverse=True)
+    for _, path in entries[max_entries:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Still mapped by another process on some platforms, try again next time
+
+def _layout(counts: Dict[str, int]):
+    """Yield (name, dtype, shape, offset) of every array for the given counts"""
+    offset = HEADER.size
+    for name, dtype, dims in ARRAYS:
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        shape = tuple(counts[d] if isinstance(d, str) else d for d in dims)
+        yield name, np.dtype(dtype), shape, offset
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+def save(path: str, key: bytes, counts: Dict[str, int], arrays: Dict[str, np.ndarray]):
+    """Write the arrays of a compiled tree to `path` (atomically, through a temporary file)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, key, *(counts[name] for name in COUNTS)))
+        for name, dtype, shape, offset in _layout(counts):
+            data = np.ascontiguousarray(arrays[name], dtype=dtype)
+            if data.shape != shape:
+                raise ValueError(f"Array {name} has shape {data.shape}, expected {shape}")
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(data.tobytes())
+    os.replace(temp_path, path)
+
+def load(path: str, key: bytes) -> Optional[Tuple[Dict[str, int], Dict[str, np.ndarray]]]:
+    """
+    Memory-map a tree written by save()
+
+    Returns:
+        (counts, arrays) with read-only arrays backed by the file, or None when
+        the file is missing, was written by another format version or for
+        another scene, or is truncated or corrupt (an index out of range)
+    """
+    if not os.path.exists(path):
+        return None
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    if len(data) < HEADER.size:
+        return None
+    magic, version, file_key, *values = HEADER.unpack(data[:HEADER.size].tobytes())
+    if magic != MAGIC or version != FORMAT_VERSION or file_key != key:
+        return None
+
+    counts = dict(zip(COUNTS, values))
+    arrays = {}
+    for name, dtype, shape, offset in _layout(counts):
+        size = int(np.prod(shape)) * dtype.itemsize
+        if offset + size > len(data):
+            return None
+        arrays[name] = data[offset:offset + size].view(dtype).reshape(shape)
+
+    for name, low, high in INDEX_RANGES:
+        values = arrays[name]
+        if len(values) and (values.min() < low or values.max() >= counts[high]):
+            return None
+    # Nodes are stored in pre-order, so children come after their parent
+    nodes = np.arange(counts["node_count"])
+    for name in ("node_front", "node_back"):
+        if np.any((arrays[name] >= 0) & (arrays[name] <= nodes)):
+            return None
+    if np.any(arrays["face_sizes"] < 0) or np.any(arrays["face_offsets"] + arrays["face_sizes"] > counts["id_count"]):
+        return None
+    os.utime(path)  # Mark the tree as recently used for prune()
+    return counts, arrays
@@ -0,0 +1,71 @@
+import numpy as np
+
+# Clip-space planes as (x, y, z, w) coefficients, a point p is inside when plane . p >= 0
+NEAR_PLANE = np.array([
+  [0.0, 0.0, 1.0, 1.0]     # Near:   z >= -w
+])
+
+FRUSTUM_PLANES = np.array([
+  [1.0, 0.0, 0.0, 1.0],    # Left:   x >= -w
+  [-1.0, 0.0, 0.0, 1.0],   # Right:  x <= w
+  [0.0, 1.0, 0.0, 1.0],    # Bottom: y >= -w
+  [0.0, -1.0, 0.0, 1.0],   # Top:    y <= w
+  [0.0, 0.0, 1.0, 1.0],    # Near:   z >= -w
+  [0.0, 0.0, -1.0, 1.0]    # Far:    z <= w
+])
+
+def getFrustumPlanes(viewProjection: np.ndarray) -> np.ndarray:
+  """World-space frustum planes of a view-projection matrix (Gribb-Hartmann)
+
+  Each clip-space plane of FRUSTUM_PLANES, applied to M @ p, is the world
+  plane FRUSTUM_PLANES @ M. Planes are returned in the same order (left,
+  right, bottom, top, near, far) as (6, 4) rows (a, b, c, d), normalized so
+  that a point p is inside when a*x + b*y + c*z + d >= 0 and the value is
+  its distance to the plane.
+  """
+  planes = FRUSTUM_PLANES @ viewProjection
+  return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+def clipEdges(clipVertices: np.ndarray, edges: np.ndarray, fullFrustum: bool = False):
+  """Clip line segments against the near plane (or the whole frustum) in clip space
+
+  All edges are processed at once with the parametric (Liang-Barsky) form of
+  homogeneous clipping: for every plane the signed distances of both
+  endpoints give the parameter at which the edge enters or leaves the
+  inside half-space, and the visible part is [max(enter), min(leave)].
+
+  Args:
+      clipVertices: (V, 4) clip-space vertices
+      edges: (E, 2) vertex index pairs
+      fullFrustum: Clip against all six frustum planes instead of the near plane only
+
+  Returns:
+      (starts, ends, visible, clipped): (E, 4) clipped endpoints, a mask of
+      edges with a visible part, and a mask of visible edges that were cut.
+      Endpoints of invisible edges are meaningless.
+  """
+  planes = FRUSTUM_PLANES if fullFrustum else NEAR_PLANE
+  p0 = clipVertices[edges[:, 0]]
+  p1 = clipVertices[edges[:, 1]]
+
+  # Signed distances of both endpoints to every plane, (E, P)
+  d0 = p0 @ planes.T
+  d1 = p1 @ planes.T
+  outside0 = d0 < 0
+  outside1 = d1 < 0
+
+  # Parameter of the intersection with each plane (only used where exactly one endpoint is outside)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    t = d0 / (d0 - d1)
+  tEnter = np.max(np.where(outside0 & ~outside1, t, 0.0), axis=1)
+  tExit = np.min(np.where(outside1 & ~outside0, t, 1.0), axis=1)
+
+  visible = ~np.any(outside0 & outside1, axis=1) & (tEnter <= tExit)
+  clipped = visible & ((tEnter > 0.0) | (tExit < 1.0))
+
+  # Move only the endpoints that were cut so untouched edges keep their exact vertices
+  delta = p1 - p0
+  starts = np.where((tEnter > 0.0)[:, None], p0 + tEnter[:, None] * delta, p0)
+  ends = np.where((tExit < 1.0)[:, None], p0 + tExit[:, None] * delta, p1)
+
+  return starts, ends, visible, clipped
@@ -1,15 +1,37 @@
 import numpy as np
 import colorsys
+import os
+import random
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from scene.Cuboid import Cuboid
 from scene.Pyramid import Pyramid
 from scene.Prism import Prism
 from scene.Cylinder import Cylinder
 from scene.Octahedron import Octahedron
+from scene.instance import Instance
+from scene.buffers import SceneBuffers
+from scene.topology import getFaceTopology
+import transformation
+from render import bsp_cache
 from typing import List, Tuple, Optional, Dict, Any, Union
 
 # Define a type for all supported objects
-SceneObject = Union[Cuboid, Pyramid, Prism, Cylinder, Octahedron]
+SceneObject = Union[Cuboid, Pyramid, Prism, Cylinder, Octahedron, Instance]
+
+# Epsilon value for floating-point comparisons against a plane
+EPSILON = 1e-5
+
+# Ways of picking the partition face at each node of the BSP tree
+PARTITION_STRATEGIES = ("first", "random", "scored")
+
+# Smallest face list worth sending to a worker process in a parallel build
+PARALLEL_THRESHOLD = 2048
+
+# Candidate box pairs tested at once when grouping overlapping objects
+SWEEP_PAIRS = 1 << 16
 
 class BSPNode:
     """Binary Space Partitioning Tree Node"""
@@ -19,38 +41,236 @@ class BSPNode:
         self.plane = plane      # The plane equation coefficients (a, b, c, d) where ax+by+cz+d=0
         self.front = None       # Front child node (positive side of plane)
         self.back = None        # Back child node (negative side of plane)
+        self.pruned = False     # The polygon was removed, the plane is only kept to order the children
+        self.inserted = False   # Added by BSPTree.insert_objects after the tree was built
     
     def is_leaf(self) -> bool:
         """Check if this node is a leaf node"""
         return self.front is None and self.back is None
 
+def _grow(array: np.ndarray, needed: int) -> np.ndarray:
+    """Return `array` with room for at least `needed` rows, doubling the capacity when it is full"""
+    if needed <= len(array):
+        return array
+    grown = np.empty((max(needed, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+class VertexPool:
+    """Growable array of homogeneous world-space vertices shared by all faces of a FaceTable"""
+    
+    def __init__(self, capacity: int = 256):
+        self._data = np.empty((capacity, 4), dtype=np.float64)
+        self.count = 0
+    
+    @property
+    def data(self) -> np.ndarray:
+        """View of the used rows, (count, 4); it is only valid until the next append"""
+        return self._data[:self.count]
+    
+    def append(self, vertices: np.ndarray) -> int:
+        """Append (n, 4) vertices and return the index of the first one"""
+        start = self.count
+        self._data = _grow(self._data, start + len(vertices))
+        self._data[start:start + len(vertices)] = vertices
+        self.count += len(vertices)
+        return start
+    
+    @classmethod
+    def from_array(cls, vertices: np.ndarray) -> 'VertexPool':
+        """Pool that starts out with `vertices` (which may be read-only, it is copied on first growth)"""
+        pool = cls(0)
+        pool._data = vertices
+        pool.count = len(vertices)
+        return pool
+
+class FaceTable:
+    """
+    Structure-of-arrays storage for polygon faces
+    
+    Face i is the polygon through the pool vertices
+    `vertex_ids[offsets[i]:offsets[i] + sizes[i]]`; its plane (a, b, c, d) is
+    row i of `planes` (the normal is the first three columns) and its color
+    row i of `colors`. Faces are addressed through lightweight Face handles.
+    """
+    
+    def __init__(self, capacity: int = 256):
+        self.pool = VertexPool(4 * capacity)
+        self._planes = np.empty((capacity, 4), dtype=np.float64)
+        self._colors = np.empty((capacity, 3), dtype=np.uint8)
+        self._offsets = np.empty(capacity, dtype=np.int64)
+        self._sizes = np.empty(capacity, dtype=np.int64)
+        self._vertex_ids = np.empty(4 * capacity, dtype=np.int64)
+        self.parents = []  # Object each face was extracted from
+        self.count = 0
+        self.id_count = 0  # Used entries of _vertex_ids
+    
+    @classmethod
+    def from_arrays(cls, planes: np.ndarray, colors: np.ndarray, offsets: np.ndarray, sizes: np.ndarray,
+                    vertex_ids: np.ndarray, vertices: np.ndarray, parents: list) -> 'FaceTable':
+        """Table over existing arrays, e.g. loaded from the tree cache; they are copied only when the table grows"""
+        table = cls(0)
+        table.pool = VertexPool.from_array(vertices)
+        table._planes = planes
+        table._colors = colors
+        table._offsets = offsets
+        table._sizes = sizes
+        table._vertex_ids = vertex_ids
+        table.parents = parents
+        table.count = len(planes)
+        table.id_count = len(vertex_ids)
+        return table
+    
+    @property
+    def planes(self) -> np.ndarray:
+        return self._planes[:self.count]
+    
+    @property
+    def normals(self) -> np.ndarray:
+        return self._planes[:self.count, :3]
+    
+    @property
+    def colors(self) -> np.ndarray:
+        return self._colors[:self.count]
+    
+    @property
+    def offsets(self) -> np.ndarray:
+        return self._offsets[:self.count]
+    
+    @property
+    def sizes(self) -> np.ndarray:
+        return self._sizes[:self.count]
+    
+    @property
+    def vertex_ids(self) -> np.ndarray:
+        return self._vertex_ids[:self.id_count]
+    
+    def _reserve(self, face_count: int, id_count: int):
+        """Make room for `face_count` more faces using `id_count` more vertex ids"""
+        needed = self.count + face_count
+        self._planes = _grow(self._planes, needed)
+        self._colors = _grow(self._colors, needed)
+        self._offsets = _grow(self._offsets, needed)
+        self._sizes = _grow(self._sizes, needed)
+        self._vertex_ids = _grow(self._vertex_ids, self.id_count + id_count)
+    
+    def add_faces(self, vertex_ids: np.ndarray, sizes: np.ndarray, colors, parents: List) -> List['Face']:
+        """
+        Add several faces at once, computing their planes in one pass
+        
+        Args:
+            vertex_ids: Pool indices of all face vertices, back to back
+            sizes: Number of vertices of every face
+            colors: RGB color of every face
+            parents: Object every face belongs to
+        
+        Returns:
+            Handles of the new faces
+        """
+        count = len(sizes)
+        self._reserve(count, len(vertex_ids))
+        first = self.count
+        offsets = self.id_count + np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+        self._vertex_ids[self.id_count:self.id_count + len(vertex_ids)] = vertex_ids
+        self._offsets[first:first + count] = offsets
+        self._sizes[first:first + count] = sizes
+        self._colors[first:first + count] = colors
+        
+        # Normal from the first three vertices of each face, normalized when not degenerate
+        vertices = self.pool.data
+        starts = offsets - self.id_count
+        v0 = vertices[vertex_ids[starts], :3]
+        normals = np.cross(vertices[vertex_ids[starts + 1], :3] - v0,
+                           vertices[vertex_ids[starts + 2], :3] - v0)
+        norms = np.sqrt(np.einsum('ij,ij->i', normals, normals))
+        np.divide(normals, norms[:, None], out=normals, where=norms[:, None] > 0)
+        self._planes[first:first + count, :3] = normals
+        self._planes[first:first + count, 3] = -np.einsum('ij,ij->i', normals, v0)
+        
+        self.parents.extend(parents)
+        self.id_count += len(vertex_ids)
+        self.count += count
+        return [Face(self, index) for index in range(first, first + count)]
+    
+    def extend(self, planes: np.ndarray, colors: np.ndarray, sizes: np.ndarray,
+               vertex_ids: np.ndarray, vertices: np.ndarray, parents: list) -> int:
+        """
+        Append the rows of another table (e.g. one built in a worker process)
+        
+        `vertex_ids` index into `vertices`, which are appended to this table's
+        pool. Planes are copied as they are. Returns the row of the first added face.
+        """
+        first = self.count
+        self._reserve(len(sizes), len(vertex_ids))
+        vertex_start = self.pool.append(vertices)
+        self._vertex_ids[self.id_count:self.id_count + len(vertex_ids)] = vertex_ids + vertex_start
+        self._offsets[first:first + len(sizes)] = self.id_count + np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        self._sizes[first:first + len(sizes)] = sizes
+        self._planes[first:first + len(sizes)] = planes
+        self._colors[first:first + len(sizes)] = colors
+        self.parents.extend(parents)
+        self.id_count += len(vertex_ids)
+        self.count += len(sizes)
+        return first
+    
+    def add_fragment(self, vertex_ids: np.ndarray, source: 'Face') -> 'Face':
+        """Add a piece of `source` (left by a split); it lies in the same plane, so the plane row is copied"""
+        self._reserve(1, len(vertex_ids))
+        index = self.count
+        self._vertex_ids[self.id_count:self.id_count + len(vertex_ids)] = vertex_ids
+        self._offsets[index] = self.id_count
+        self._sizes[index] = len(vertex_ids)
+        self._planes[index] = self._planes[source.index]
+        self._colors[index] = self._colors[source.index]
+        self.parents.append(self.parents[source.index])
+        self.id_count += len(vertex_ids)
+        self.count += 1
+        return Face(self, index)
+    
+    def face_vertex_ids(self, index: int) -> np.ndarray:
+        start = self._offsets[index]
+        return self._vertex_ids[start:start + self._sizes[index]]
+
 class Face:
-    """Represents a polygon face in 3D space"""
+    """Handle to one polygon face stored in a FaceTable"""
+    
+    __slots__ = ('table', 'index')
     
-    def __init__(self, vertices: np.ndarray, color=(255, 255, 255), parent_object=None):
+    def __init__(self, table: FaceTable, index: int):
         """
         Args:
-            vertices: List of 3D vertices that make up the face
-            color: RGB color tuple
-            parent_object: Reference to the parent object this face belongs to
-        """
-        self.vertices = vertices
-        self.color = color
-        self.parent_object = parent_object
-        
-        # Calculate face normal using first three vertices
-        v1 = vertices[1][:3] - vertices[0][:3]  # Vector from v0 to v1
-        v2 = vertices[2][:3] - vertices[0][:3]  # Vector from v0 to v2
-        self.normal = np.cross(v1, v2)          # Cross product gives normal vector
-        
-        # Normalize the normal vector
-        norm = np.linalg.norm(self.normal)
-        if norm > 0:
-            self.normal = self.normal / norm
-            
-        # Calculate the plane equation ax + by + cz + d = 0
-        # Where (a,b,c) is the normal vector and d is the negative dot product with a point on the plane
-        self.plane = np.append(self.normal, -np.dot(self.normal, vertices[0][:3]))
+            table: Table holding the face data
+            index: Row of the face in the table
+        """
+        self.table = table
+        self.index = index
+    
+    @property
+    def vertex_ids(self) -> np.ndarray:
+        """Indices of the face's vertices in the table's vertex pool"""
+        return self.table.face_vertex_ids(self.index)
+    
+    @property
+    def vertices(self) -> np.ndarray:
+        """(k, 4) homogeneous world-space vertices of the face"""
+        return self.table.pool.data[self.vertex_ids]
+    
+    @property
+    def normal(self) -> np.ndarray:
+        return self.table._planes[self.index, :3]
+    
+    @property
+    def plane(self) -> np.ndarray:
+        """The plane equation ax + by + cz + d = 0 as (a, b, c, d)"""
+        return self.table._planes[self.index]
+    
+    @property
+    def color(self) -> Tuple[int, int, int]:
+        return tuple(int(c) for c in self.table._colors[self.index])
+    
+    @property
+    def parent_object(self):
+        return self.table.parents[self.index]
     
     def get_centroid(self) -> np.ndarray:
         """Calculate and return the centroid of the face"""
@@ -65,10 +285,8 @@ class Face:
             Negative value if point is behind the plane
             Zero if point is on the plane
         """
-        if len(point) == 4:  # Handle homogeneous coordinates
-            point = point[:3]
-            
-        return np.dot(self.normal, point) + self.plane[3]
+        plane = self.plane
+        return np.dot(plane[:3], point[:3]) + plane[3]
     
     def split_polygon(self, other_face) -> Tuple[Optional['Face'], Optional['Face']]:
         """
@@ -77,361 +295,819 @@ class Face:
         Returns:
             (front_face, back_face) tuple where either may be None if no vertices on that side
         """
-        # Epsilon value for floating-point comparisons
-        EPSILON = 1e-5
-        
-        # Classify each vertex of the other face
-        vertex_classifications = []
-        for vertex in other_face.vertices:
-            classification = self.classify_point(vertex)
-            if abs(classification) < EPSILON:
-                vertex_classifications.append(0)  # On plane
-            elif classification > 0:
-                vertex_classifications.append(1)  # Front side
-            else:
-                vertex_classifications.append(-1)  # Back side
-        
-        # Check if all vertices are on one side or on the plane
-        if all(c >= 0 for c in vertex_classifications):
-            return (other_face, None)  # All vertices are in front or on the plane
-        elif all(c <= 0 for c in vertex_classifications):
-            return (None, other_face)  # All vertices are behind or on the plane
-        
-        # If we got here, the polygon straddles the plane and needs to be split
-        front_vertices = []
-        back_vertices = []
-        
-        # Process each edge to find intersections with the plane
-        vertex_count = len(other_face.vertices)
-        for i in range(vertex_count):
-            current = other_face.vertices[i]
-            current_class = vertex_classifications[i]
-            
-            # Add current vertex to appropriate list(s)
-            if current_class >= 0:
-                front_vertices.append(current)
-            if current_class <= 0:
-                back_vertices.append(current)
-            
-            # Get the next vertex and its classification
-            next_idx = (i + 1) % vertex_count
-            next_vertex = other_face.vertices[next_idx]
-            next_class = vertex_classifications[next_idx]
-            
-            # Skip if both vertices are on the same side or one is on the plane
-            if current_class == 0 or next_class == 0 or current_class == next_class:
-                continue
-                
-            # Calculate the intersection point
-            # We have an edge crossing the plane
-            # Get the two vertices that make up the edge
-            v1 = current[:3]  # Get x,y,z (drop homogeneous coordinate)
-            v2 = next_vertex[:3]
-            
-            # Calculate the distance from v1 to the plane
-            dist1 = self.classify_point(v1)
-            dist2 = self.classify_point(v2)
-            
-            # Calculate intersection parameter t where the plane intersects the edge
-            # The intersection point is v1 + t * (v2 - v1)
-            t = dist1 / (dist1 - dist2)
-            
-            # Calculate the intersection point
-            intersection = v1 + t * (v2 - v1)
-            
-            # Add homogeneous coordinate (w=1)
-            intersection_point = np.append(intersection, 1.0)
-            
-            # Add intersection point to both polygon parts
-            front_vertices.append(intersection_point)
-            back_vertices.append(intersection_point)
-        
-        # Create new faces if there are enough vertices
-        front_face = None
-        back_face = None
-        
-        if len(front_vertices) >= 3:
-            front_face = Face(np.array(front_vertices), other_face.color, other_face.parent_object)
-        
-        if len(back_vertices) >= 3:
-            back_face = Face(np.array(back_vertices), other_face.color, other_face.parent_object)
-            
-        return (front_face, back_face)
+        return split_face(self.plane, other_face)
 
-def extract_faces_from_cuboid(cuboid: Cuboid) -> List[Face]:
-    """Extract the faces from a cuboid object"""
-    vertices = cuboid.vertices
-    
-    # Define the 6 faces of the cuboid
-    face_indices = [
-        [0, 1, 3, 2],  # Front face
-        [4, 6, 7, 5],  # Back face
-        [0, 2, 6, 4],  # Left face
-        [1, 5, 7, 3],  # Right face
-        [2, 3, 7, 6],  # Top face
-        [0, 4, 5, 1]   # Bottom face
-    ]
-    
-    # Colors for faces
-    colors = [
-        (255, 0, 0),    # Red (Front)
-        (0, 255, 0),    # Green (Back)
-        (0, 0, 255),    # Blue (Left)
-        (255, 255, 0),  # Yellow (Right)
-        (255, 0, 255),  # Magenta (Top)
-        (0, 255, 255)   # Cyan (Bottom)
-    ]
-    
-    faces = []
-    for i, indices in enumerate(face_indices):
-        face_vertices = np.array([vertices[idx] for idx in indices])
-        faces.append(Face(face_vertices, colors[i], cuboid))
-    
-    return faces
-
-def extract_faces_from_pyramid(pyramid: Pyramid) -> List[Face]:
-    """Extract the faces from a pyramid object"""
-    vertices = pyramid.vertices
-    
-    # Define the 5 faces of the pyramid (1 square base + 4 triangular faces)
-    face_indices = [
-        [0, 1, 2, 3],  # Base (square)
-        [0, 1, 4],     # Front triangular face
-        [1, 2, 4],     # Right triangular face
-        [2, 3, 4],     # Back triangular face
-        [3, 0, 4]      # Left triangular face
-    ]
-    
-    # Colors for faces
-    colors = [
-        (200, 100, 100),  # Base
-        (100, 200, 100),  # Front face
-        (100, 100, 200),  # Right face
-        (200, 200, 100),  # Back face
-        (200, 100, 200)   # Left face
-    ]
-    
-    faces = []
-    for i, indices in enumerate(face_indices):
-        face_vertices = np.array([vertices[idx] for idx in indices])
-        faces.append(Face(face_vertices, colors[i], pyramid))
-    
-    return faces
+def split_face(plane: np.ndarray, face: Face) -> Tuple[Optional[Face], Optional[Face]]:
+    """
+    Split a face with a plane (a, b, c, d)
+    
+    Intersection points are appended to the vertex pool of the face's table
+    once and shared by both fragments.
+    
+    Returns:
+        (front_face, back_face) tuple where either may be None if no vertices on that side
+    """
+    # Signed distances of all vertices in one product, snapped to the plane within EPSILON
+    table = face.table
+    vertex_ids = face.vertex_ids
+    vertices = table.pool.data[vertex_ids]
+    distances = vertices[:, :3] @ plane[:3] + plane[3]
+    
+    # Check if all vertices are on one side or on the plane
+    if distances.min() > -EPSILON:
+        return (face, None)  # All vertices are in front or on the plane
+    elif distances.max() < EPSILON:
+        return (None, face)  # All vertices are behind or on the plane
+    
+    classes = np.sign(distances).astype(np.int8)
+    classes[np.abs(distances) < EPSILON] = 0
+    
+    # If we got here, the polygon straddles the plane and needs to be split.
+    # Edge i runs from vertex i to vertex i + 1; it crosses the plane when its
+    # endpoints lie strictly on opposite sides
+    vertex_count = len(vertices)
+    next_index = np.arange(1, vertex_count + 1)
+    next_index[-1] = 0
+    crossing = classes * classes[next_index] < 0
+    
+    # Intersection points of all crossing edges (w = 1)
+    start_distances = distances[crossing]
+    t = start_distances / (start_distances - distances[next_index[crossing]])
+    starts = vertices[crossing]
+    ends = vertices[next_index[crossing]]
+    intersections = np.empty((len(t), 4))
+    intersections[:, :3] = starts[:, :3] + t[:, None] * (ends[:, :3] - starts[:, :3])
+    intersections[:, 3] = 1.0
+    first_new = table.pool.append(intersections)
+    
+    # Interleave vertex i with the intersection on edge i, then pick each side's slots
+    slots = np.empty(2 * vertex_count, dtype=np.int64)
+    slots[0::2] = vertex_ids
+    slots[1::2][crossing] = np.arange(first_new, first_new + len(t))
+    front_slots = np.empty(2 * vertex_count, dtype=bool)
+    front_slots[0::2] = classes >= 0
+    front_slots[1::2] = crossing
+    back_slots = np.empty(2 * vertex_count, dtype=bool)
+    back_slots[0::2] = classes <= 0
+    back_slots[1::2] = crossing
+    
+    # Create new faces if there are enough vertices
+    front_face = None
+    back_face = None
+    
+    if np.count_nonzero(front_slots) >= 3:
+        front_face = table.add_fragment(slots[front_slots], face)
+    
+    if np.count_nonzero(back_slots) >= 3:
+        back_face = table.add_fragment(slots[back_slots], face)
+        
+    return (front_face, back_face)
 
-def extract_faces_from_prism(prism: Prism) -> List[Face]:
-    """Extract the faces from a triangular prism object"""
-    vertices = prism.vertices
-    
-    # Define the 5 faces of the prism (2 triangular ends + 3 rectangular sides)
-    face_indices = [
-        [0, 1, 2],     # Bottom triangular face
-        [3, 4, 5],     # Top triangular face
-        [0, 3, 4, 1],  # Side rectangular face 1
-        [1, 4, 5, 2],  # Side rectangular face 2
-        [2, 5, 3, 0]   # Side rectangular face 3
-    ]
-    
-    # Colors for faces
-    colors = [
-        (255, 100, 100),  # Bottom triangle
-        (100, 255, 100),  # Top triangle
-        (100, 100, 255),  # Side 1
-        (255, 255, 100),  # Side 2
-        (255, 100, 255)   # Side 3
-    ]
-    
-    faces = []
-    for i, indices in enumerate(face_indices):
-        face_vertices = np.array([vertices[idx] for idx in indices])
-        faces.append(Face(face_vertices, colors[i], prism))
-    
-    return faces
+# Face colors of the primitives with a fixed layout, in the order of their getFaces()
+CUBOID_FACE_COLORS = [
+    (255, 0, 0),    # Red (Front)
+    (0, 255, 0),    # Green (Back)
+    (0, 0, 255),    # Blue (Left)
+    (255, 255, 0),  # Yellow (Right)
+    (255, 0, 255),  # Magenta (Top)
+    (0, 255, 255)   # Cyan (Bottom)
+]
+PYRAMID_FACE_COLORS = [
+    (200, 100, 100),  # Base
+    (100, 200, 100),  # Front face
+    (100, 100, 200),  # Right face
+    (200, 200, 100),  # Back face
+    (200, 100, 200)   # Left face
+]
+PRISM_FACE_COLORS = [
+    (255, 100, 100),  # Bottom triangle
+    (100, 255, 100),  # Top triangle
+    (100, 100, 255),  # Side 1
+    (255, 255, 100),  # Side 2
+    (255, 100, 255)   # Side 3
+]
 
-def extract_faces_from_cylinder(cylinder: Cylinder) -> List[Face]:
-    """Extract the faces from a cylinder object"""
-    vertices = cylinder.vertices
-    num_segments = cylinder.segments
-    
-    faces = []
-    
-    # Top and bottom center indices
-    bottom_center_idx = len(vertices) - 2
-    top_center_idx = len(vertices) - 1
-    
-    # Side rectangular faces
-    for i in range(num_segments):
-        bottom_idx = i * 2
-        top_idx = i * 2 + 1
-        next_bottom_idx = (i * 2 + 2) % (num_segments * 2)
-        next_top_idx = (i * 2 + 3) % (num_segments * 2)
-        
-        # Create rectangular side face
-        face_vertices = np.array([
-            vertices[bottom_idx],
-            vertices[next_bottom_idx], 
-            vertices[next_top_idx], 
-            vertices[top_idx]
-        ])
-        
-        # Use color based on segment position for variety
-        hue = i / num_segments
-        r, g, b = colorsys.hsv_to_rgb(hue, 0.7, 0.9)
-        color = (int(r * 255), int(g * 255), int(b * 255))
-        
-        faces.append(Face(face_vertices, color, cylinder))
-    
-    # Bottom triangular faces (forming the circle)
-    for i in range(num_segments):
-        bottom_idx = i * 2
-        next_bottom_idx = (i * 2 + 2) % (num_segments * 2)
-        
-        face_vertices = np.array([
-            vertices[bottom_idx],
-            vertices[next_bottom_idx],
-            vertices[bottom_center_idx]
-        ])
-        
-        faces.append(Face(face_vertices, (100, 100, 150), cylinder))
-    
-    # Top triangular faces (forming the circle)
-    for i in range(num_segments):
-        top_idx = i * 2 + 1
-        next_top_idx = (i * 2 + 3) % (num_segments * 2)
-        
-        face_vertices = np.array([
-            vertices[top_idx],
-            vertices[next_top_idx],
-            vertices[top_center_idx]
-        ])
-        
-        faces.append(Face(face_vertices, (150, 100, 100), cylinder))
-    
-    return faces
+# Default face colors, computed once per topology key like the face layout itself
+_face_colors: Dict[tuple, np.ndarray] = {}
 
-def extract_faces_from_octahedron(octahedron: Octahedron) -> List[Face]:
-    """Extract the faces from an octahedron object"""
-    vertices = octahedron.vertices
-    
-    # Define the 8 triangular faces of the octahedron
-    face_indices = [
-        [0, 2, 4],  # Top-Right-Front
-        [0, 4, 3],  # Top-Front-Left
-        [0, 3, 5],  # Top-Left-Back
-        [0, 5, 2],  # Top-Back-Right
-        [1, 2, 4],  # Bottom-Right-Front
-        [1, 4, 3],  # Bottom-Front-Left
-        [1, 3, 5],  # Bottom-Left-Back
-        [1, 5, 2]   # Bottom-Back-Right
-    ]
-    
-    # Generate colors for each face
+def _hue_colors(count: int, saturation: float) -> List[Tuple[int, int, int]]:
+    """Colors spread evenly around the hue circle"""
     colors = []
-    for i in range(8):
-        # Use hue to generate different colors
-        hue = i / 8
-        r, g, b = colorsys.hsv_to_rgb(hue, 0.8, 0.9)
+    for i in range(count):
+        r, g, b = colorsys.hsv_to_rgb(i / count, saturation, 0.9)
         colors.append((int(r * 255), int(g * 255), int(b * 255)))
+    return colors
+
+def default_face_colors(shape: SceneObject) -> np.ndarray:
+    """
+    Default color of every face of a primitive, as an (F, 3) uint8 array
     
-    faces = []
-    for i, indices in enumerate(face_indices):
-        face_vertices = np.array([vertices[idx] for idx in indices])
-        faces.append(Face(face_vertices, colors[i], octahedron))
+    Raises:
+        TypeError: If the primitive type has no face colors
+    """
+    key = shape.getTopologyKey()
+    colors = _face_colors.get(key)
+    if colors is not None:
+        return colors
+    
+    if isinstance(shape, Cuboid):
+        colors = CUBOID_FACE_COLORS
+    elif isinstance(shape, Pyramid):
+        colors = PYRAMID_FACE_COLORS
+    elif isinstance(shape, Prism):
+        colors = PRISM_FACE_COLORS
+    elif isinstance(shape, Cylinder):
+        # A hue per side segment, then the bottom and top cap triangles
+        segments = shape.segments
+        colors = _hue_colors(segments, 0.7) + [(100, 100, 150)] * segments + [(150, 100, 100)] * segments
+    elif isinstance(shape, Octahedron):
+        colors = _hue_colors(8, 0.8)
+    else:
+        raise TypeError(f"Unsupported object type: {type(shape)}")
     
-    return faces
+    colors = np.array(colors, dtype=np.uint8)
+    _face_colors[key] = colors
+    return colors
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Indices starts[i]:starts[i] + counts[i] of all i, back to back"""
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum(), dtype=np.int64)
 
-def extract_faces_from_object(obj: SceneObject) -> List[Face]:
-    """Extract faces from any supported object type"""
-    try:
-        if isinstance(obj, Cuboid):
-            return extract_faces_from_cuboid(obj)
-        elif isinstance(obj, Pyramid):
-            return extract_faces_from_pyramid(obj)
-        elif isinstance(obj, Prism):
-            return extract_faces_from_prism(obj)
-        elif isinstance(obj, Cylinder):
-            return extract_faces_from_cylinder(obj)
-        elif isinstance(obj, Octahedron):
-            return extract_faces_from_octahedron(obj)
+def extract_faces(objects: List[SceneObject], table: Optional[FaceTable] = None,
+                  buffers: Optional[SceneBuffers] = None) -> List[Face]:
+    """
+    Extract the faces of several objects into a face table at once
+    
+    When all objects are packed in `buffers` (see Scene.getBuffers), their
+    world-space vertices are copied from the buffers' vertices, which are
+    transformed once per scene version, and their faces are the buffers'
+    face indices moved to the copied blocks. Otherwise objects are grouped
+    by base mesh: all scene instances of one mesh form a group, any other
+    object is a group of its own. The world-space vertices of a group are
+    appended to the vertex pool as one block, and its faces are gathered
+    from the cached face topology of the mesh with one offset per object.
+    Either way nothing is done per face in Python.
+    
+    Args:
+        objects: Primitives or scene instances of them
+        table: Table to add the faces to (a new one is created when None)
+        buffers: Packed buffers of the scene the objects belong to
+    
+    Returns:
+        Handles of the new faces, object by object in the order of `objects`
+    """
+    if table is None:
+        table = FaceTable()
+    rows = buffers.findObjects(objects) if buffers is not None and objects else None
+    if rows is not None:
+        return _extract_packed_faces(objects, rows, buffers, table)
+    
+    groups = {}
+    for index, obj in enumerate(objects):
+        key = ("mesh", id(obj.mesh)) if isinstance(obj, Instance) else ("object", id(obj))
+        groups.setdefault(key, []).append(index)
+    
+    object_faces = [[] for _ in objects]
+    for indices in groups.values():
+        members = [objects[index] for index in indices]
+        shape = members[0].mesh if isinstance(members[0], Instance) else members[0]
+        try:
+            topology = getFaceTopology(shape)
+            colors = default_face_colors(shape)
+            vertex_count = len(shape.vertices)
+            if topology.indices.max(initial=-1) >= vertex_count:
+                raise IndexError(f"face index out of range for {vertex_count} vertices")
+        except (AttributeError, TypeError, IndexError) as e:
+            print(f"Warning: Could not extract faces from {type(shape).__name__}: {e}")
+            continue
+        
+        if isinstance(members[0], Instance):
+            matrices = np.stack([obj.modelMatrix for obj in members])
+            vertices = transformation.transformInstances(shape.vertices, matrices)
         else:
-            raise TypeError(f"Unsupported object type: {type(obj)}")
-    except IndexError as e:
-        print(f"Warning: Could not extract faces from {type(obj).__name__}: {e}")
-        return []  # Return empty list if extraction fails
+            vertices = np.stack([obj.vertices for obj in members])
+        first = table.pool.append(vertices.reshape(-1, 4))
+        
+        # Vertex ids of every instance: the shared topology shifted to its block in the pool
+        count = len(members)
+        bases = first + vertex_count * np.arange(count, dtype=np.int64)
+        vertex_ids = (bases[:, None] + topology.indices[None, :]).ravel()
+        parents = [obj for obj in members for _ in range(topology.faceCount)]
+        faces = table.add_faces(vertex_ids, np.tile(topology.sizes, count), np.tile(colors, (count, 1)), parents)
+        for k, index in enumerate(indices):
+            object_faces[index] = faces[k * topology.faceCount:(k + 1) * topology.faceCount]
+    
+    return [face for faces in object_faces for face in faces]
+
+def _extract_packed_faces(objects: List[Instance], rows: np.ndarray, buffers: SceneBuffers,
+                          table: FaceTable) -> List[Face]:
+    """Faces of scene objects taken from the scene's packed buffers, see extract_faces"""
+    vertex_counts = buffers.objectCounts[rows]
+    face_counts = buffers.objectFaceCounts[rows]
+    first = table.pool.append(buffers.vertices[_ranges(buffers.objectOffsets[rows], vertex_counts)])
+    
+    # Packed vertex indices of every face, shifted from the object's rows in the buffers to its block in the pool
+    face_rows = _ranges(buffers.objectFaceOffsets[rows], face_counts)
+    sizes = buffers.faceSizes[face_rows]
+    shifts = first + np.cumsum(vertex_counts) - vertex_counts - buffers.objectOffsets[rows]
+    vertex_ids = (buffers.faceIndices[_ranges(buffers.faceOffsets[face_rows], sizes)] +
+                  np.repeat(np.repeat(shifts, face_counts), sizes))
+    colors = np.concatenate([default_face_colors(obj.mesh) for obj in objects])
+    parents = [obj for obj, count in zip(objects, face_counts.tolist()) for _ in range(count)]
+    return table.add_faces(vertex_ids, sizes, colors, parents)
 
 class BSPTree:
     """A Binary Space Partitioning tree"""
     
-    def __init__(self):
+    def __init__(self, strategy: str = "first", sample_size: int = 16,
+                 split_weight: float = 8.0, balance_weight: float = 1.0, seed: int = 0,
+                 workers: int = 0, parallel_threshold: int = PARALLEL_THRESHOLD):
+        """
+        Args:
+            strategy: How partition faces are picked, one of PARTITION_STRATEGIES:
+                "first" takes the first face, "random" a random one and "scored"
+                the candidate with the lowest split/balance score
+            sample_size: Maximum number of candidates scored per node
+            split_weight: Cost of every face the candidate plane would split
+            balance_weight: Cost of every face of imbalance between front and back
+            seed: Seed for the "random" strategy
+            workers: Number of worker processes for building large trees
+                (0 builds serially, None uses all cores)
+            parallel_threshold: Smallest number of faces for which a subtree
+                is built in a worker process
+        """
+        if strategy not in PARTITION_STRATEGIES:
+            raise ValueError(f"Unknown partition strategy: {strategy}")
         self.root = None
-        self.face_count = 0  # Track number of faces in tree
+        self.face_table = FaceTable()  # Storage of all faces and fragments of the tree
+        self.face_count = 0  # Nodes holding a polygon (a face or a fragment of one)
+        self.strategy = strategy
+        self.sample_size = sample_size
+        self.split_weight = split_weight
+        self.balance_weight = balance_weight
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        
+        # Shape of the resulting tree
+        self.node_count = 0
+        self.split_count = 0
+        self.depth = 0
+        
+        # Nodes added by insert_objects and kept by remove_objects only for their
+        # plane; both make the tree worse than a fresh build, see degradation()
+        self.inserted_nodes = 0
+        self.pruned_nodes = 0
     
-    def build_tree(self, faces: List[Face]) -> BSPNode:
+    def choose_partition(self, faces: List[Face]) -> int:
+        """Return the index of the face whose plane should partition `faces`"""
+        if self.strategy == "first" or len(faces) == 1:
+            return 0
+        if self.strategy == "random":
+            return self.rng.randrange(len(faces))
+        return self._best_scored_partition(faces)
+    
+    def _best_scored_partition(self, faces: List[Face]) -> int:
         """
-        Recursively build a BSP tree from a list of faces
+        Score a bounded, evenly spread sample of candidate planes against all faces
         
-        Args:
-            faces: List of Face objects to organize into a BSP tree
-            
-        Returns:
-            The root node of the BSP tree
+        Every face is classified against every candidate plane in one array
+        operation. The score is split_weight * splits + balance_weight * |front - back|,
+        ties go to the earlier candidate so the choice is deterministic.
         """
-        if not faces:
-            return None
+        count = len(faces)
+        if count <= self.sample_size:
+            candidates = np.arange(count)
+        else:
+            candidates = np.unique(np.linspace(0, count - 1, self.sample_size).astype(int))
+        
+        table = self.face_table
+        rows = np.array([face.index for face in faces])
+        sizes = table.sizes[rows]
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        # Pool ids of the vertices of every face, back to back
+        ids = table.vertex_ids[np.repeat(table.offsets[rows] - offsets, sizes) + np.arange(sizes.sum())]
+        vertices = table.pool.data[ids, :3]
+        planes = table.planes[rows[candidates]]
+        
+        # Signed distances of every vertex to every candidate plane, (vertices, candidates)
+        distances = vertices @ planes[:, :3].T + planes[:, 3]
+        has_front = np.logical_or.reduceat(distances > EPSILON, offsets, axis=0)
+        has_back = np.logical_or.reduceat(distances < -EPSILON, offsets, axis=0)
+        
+        splits = np.count_nonzero(has_front & has_back, axis=0)
+        # Faces on the plane go to the front, like split_polygon; the candidate itself is not counted
+        front = np.count_nonzero(~has_back, axis=0) - 1
+        back = np.count_nonzero(has_back & ~has_front, axis=0)
         
-        # Use a better heuristic for selecting a good partition face
-        # For simplicity, we'll use the first face but more sophisticated
-        # approaches could be implemented here
-        partition_face = faces[0]
+        scores = self.split_weight * splits + self.balance_weight * np.abs(front - back)
+        return int(candidates[np.argmin(scores)])
+    
+    def _partition(self, faces: List[Face], depth: int) -> Tuple[BSPNode, List[Face], List[Face]]:
+        """Create the node for `faces` and split the other faces into its front and back lists"""
+        self.node_count += 1
+        self.face_count += 1
+        self.depth = max(self.depth, depth)
+        
+        # Pick the partition face with the configured strategy
+        partition_index = self.choose_partition(faces)
+        partition_face = faces[partition_index]
         node = BSPNode(polygon=partition_face, plane=partition_face.plane)
         
         front_list = []
         back_list = []
         
         # Classify the remaining faces
-        for face in faces[1:]:
+        for face in faces[:partition_index] + faces[partition_index + 1:]:
             front_part, back_part = partition_face.split_polygon(face)
             
             if front_part:
                 front_list.append(front_part)
-                self.face_count += 1
             if back_part:
                 back_list.append(back_part)
-                self.face_count += 1
+            if front_part and back_part:
+                self.split_count += 1
+        
+        return node, front_list, back_list
+    
+    def build_tree(self, faces: List[Face], depth: int = 1) -> BSPNode:
+        """
+        Recursively build a BSP tree from a list of faces
+        
+        Args:
+            faces: List of Face objects to organize into a BSP tree
+            depth: Depth of the node being built (1 for the root)
+            
+        Returns:
+            The root node of the BSP tree
+        """
+        if not faces:
+            return None
+        
+        node, front_list, back_list = self._partition(faces, depth)
         
         # Recursively build sub-trees
         if front_list:
-            node.front = self.build_tree(front_list)
+            node.front = self.build_tree(front_list, depth + 1)
         if back_list:
-            node.back = self.build_tree(back_list)
+            node.back = self.build_tree(back_list, depth + 1)
             
         return node
     
-    def create_from_objects(self, objects: List[SceneObject]):
-        """Build a BSP tree from a list of 3D objects"""
-        all_faces = []
+    def build_tree_parallel(self, faces: List[Face], workers: Optional[int] = None) -> BSPNode:
+        """
+        Build a BSP tree using a pool of worker processes
         
-        # Extract all faces from all objects
-        for obj in objects:
-            try:
-                faces = extract_faces_from_object(obj)
-                all_faces.extend(faces)
-            except Exception as e:
-                print(f"Warning: Error processing {type(obj).__name__}: {e}")
+        The top of the tree is built here until the face lists get small
+        enough to be split between the workers; from then on the front and
+        back lists are independent, so every subtree with at least
+        parallel_threshold faces is built in a worker and stitched back in
+        (smaller ones are built here meanwhile). Nodes are partitioned exactly
+        as in build_tree, so for the deterministic strategies the result is
+        the same tree as a serial build.
+        
+        Args:
+            faces: List of Face objects to organize into a BSP tree
+            workers: Number of worker processes (None uses all cores)
+            
+        Returns:
+            The root node of the BSP tree
+        """
+        workers = workers or os.cpu_count() or 1
+        # Expand the top serially until there are a few tasks per worker
+        task_size = max(2 * self.parallel_threshold, len(faces) // (4 * workers))
+        
+        # Subtrees left to build: (parent node, True for its front child, faces, depth)
+        pending = []
+        root_holder = BSPNode()
+        stack = [(root_holder, True, faces, 1)]
+        while stack:
+            parent, is_front, face_list, depth = stack.pop()
+            if len(face_list) <= task_size:
+                pending.append((parent, is_front, face_list, depth))
+                continue
+            node, front_list, back_list = self._partition(face_list, depth)
+            self._attach(parent, is_front, node)
+            if back_list:
+                stack.append((node, False, back_list, depth + 1))
+            if front_list:
+                stack.append((node, True, front_list, depth + 1))
+        
+        remote = [task for task in pending if len(task[2]) >= self.parallel_threshold]
+        local = deque(task for task in pending if len(task[2]) < self.parallel_threshold)
+        parents = []
+        parent_indices = {}
+        results = None
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_build_subtree, self._params(),
+                                       *self._export_faces(task[2], parents, parent_indices), task[3])
+                           for task in remote]
+                # Small subtrees are built here meanwhile, each taken off the list once it is counted
+                while local:
+                    parent, is_front, face_list, depth = local.popleft()
+                    self._attach(parent, is_front, self.build_tree(face_list, depth))
+                results = [future.result() for future in futures]
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Warning: Parallel BSP build failed, building serially: {e}")
+        
+        # Worker subtrees are only imported (and counted) once all of them arrived,
+        # so a pool failing halfway leaves nothing to count twice in the serial fallback
+        if results is not None:
+            for (parent, is_front, _, _), result in zip(remote, results):
+                self._attach(parent, is_front, self._import_subtree(result, parents))
+        else:
+            local.extend(remote)
+        for parent, is_front, face_list, depth in local:
+            self._attach(parent, is_front, self.build_tree(face_list, depth))
+        
+        return root_holder.front
+    
+    @staticmethod
+    def _attach(parent: BSPNode, is_front: bool, node: Optional[BSPNode]):
+        if is_front:
+            parent.front = node
+        else:
+            parent.back = node
+    
+    def _params(self) -> tuple:
+        """Constructor arguments for an equivalent (serial) tree in a worker process"""
+        return (self.strategy, self.sample_size, self.split_weight, self.balance_weight, self.seed)
+    
+    def _export_faces(self, faces: List[Face], parents: list, parent_indices: Dict[int, int]) -> tuple:
+        """Pack faces into plain arrays for a worker; parent objects are replaced by indices into `parents`"""
+        table = self.face_table
+        rows = np.array([face.index for face in faces])
+        vertex_ids = np.concatenate([table.face_vertex_ids(row) for row in rows.tolist()])
+        parent_ids = []
+        for row in rows.tolist():
+            parent = table.parents[row]
+            if id(parent) not in parent_indices:
+                parent_indices[id(parent)] = len(parents)
+                parents.append(parent)
+            parent_ids.append(parent_indices[id(parent)])
+        return (table.planes[rows], table.colors[rows], table.sizes[rows],
+                table.pool.data[vertex_ids], parent_ids)
+    
+    def _import_subtree(self, result: tuple, parents: list, depth_offset: int = 0,
+                        matrix: Optional[np.ndarray] = None) -> BSPNode:
+        """
+        Append a subtree packed by _export_subtree to this tree's face table and return its root
+        
+        Args:
+            result: The packed subtree
+            parents: Parent objects, indexed by the packed parent ids
+            depth_offset: Added to the depth of the packed subtree
+            matrix: Transform applied to the subtree's vertices and planes (e.g.
+                the model matrix of an instance whose mesh tree is in object space)
+        """
+        (front, back, polygons, planes, colors, sizes, vertex_ids, vertices, parent_ids,
+         node_count, split_count, face_count, depth) = result
+        if matrix is not None:
+            vertices = vertices @ matrix.T
+            # Planes are covectors: (a, b, c, d) maps to (a, b, c, d) @ inverse(matrix), then renormalize
+            planes = planes @ np.linalg.inv(matrix)
+            norms = np.linalg.norm(planes[:, :3], axis=1)
+            np.divide(planes, norms[:, None], out=planes, where=norms[:, None] > 0)
+        first = self.face_table.extend(planes, colors, sizes, vertex_ids, vertices,
+                                       [parents[i] for i in parent_ids])
+        nodes = [BSPNode(polygon=Face(self.face_table, first + row), plane=self.face_table.planes[first + row])
+                 for row in polygons.tolist()]
+        for node, front_index, back_index in zip(nodes, front.tolist(), back.tolist()):
+            node.front = nodes[front_index] if front_index >= 0 else None
+            node.back = nodes[back_index] if back_index >= 0 else None
+        
+        self.node_count += node_count
+        self.split_count += split_count
+        self.face_count += face_count
+        self.depth = max(self.depth, depth + depth_offset)
+        return nodes[0]
+    
+    def create_from_objects(self, objects: List[SceneObject], buffers: Optional[SceneBuffers] = None):
+        """
+        Build a BSP tree from a list of 3D objects
+        
+        Args:
+            objects: List of 3D objects
+            buffers: Packed buffers of the scene the objects belong to, see extract_faces
+        """
+        self.face_table = FaceTable()
+        
+        # Extract all faces from all objects into one table
+        all_faces = extract_faces(objects, self.face_table, buffers)
         
         if not all_faces:
             print("Warning: No faces were extracted from objects")
             return
             
-        self.face_count = len(all_faces)
-        # Build the tree
-        self.root = self.build_tree(all_faces)
+        # Build the tree, in worker processes when it is large enough to pay off
+        if self.workers != 0 and len(all_faces) >= 2 * self.parallel_threshold:
+            self.root = self.build_tree_parallel(all_faces, self.workers)
+        else:
+            self.root = self.build_tree(all_faces)
+    
+    def create_two_level(self, objects: List[SceneObject], subtree_cache: Optional[dict] = None,
+                         buffers: Optional[SceneBuffers] = None):
+        """
+        Build a two-level tree: an object level of separating planes over per-object trees
+        
+        Every object whose bounding box does not overlap another one gets its
+        own tree, built once per mesh in object space and moved into place
+        with the instance's model matrix. Objects with overlapping boxes are
+        merged into one group that shares a tree built in world space. Groups
+        are then ordered by axis-aligned planes that separate their boxes
+        (splitter nodes without a polygon); groups that no axis-aligned plane
+        can separate are merged as well.
+        
+        Built subtrees are kept in `subtree_cache` (per mesh, and per set of
+        objects for merged groups), so a rebuild after a scene change only
+        builds the trees of new meshes and changed groups.
+        
+        Args:
+            objects: List of 3D objects
+            subtree_cache: Dictionary kept between builds (only used, never owned, by the tree)
+            buffers: Packed buffers of the scene the objects belong to, used
+                for the faces of merged groups (see extract_faces)
+        """
+        if subtree_cache is None:
+            subtree_cache = {}
+        self.face_table = FaceTable()
+        
+        # World-space bounding boxes
+        boxes = []
+        for obj in objects:
+            vertices = np.asarray(obj.vertices)[:, :3]
+            boxes.append((vertices.min(axis=0), vertices.max(axis=0)))
+        groups = self._overlap_groups(boxes)
+        if not groups:
+            print("Warning: No faces were extracted from objects")
+            return
+        
+        # Trees of objects and groups that are no longer in the scene are dropped
+        # from the cache; mesh trees are kept, they are small and shared
+        used_keys = set()
+        self.root = self._build_object_level(objects, groups, subtree_cache, used_keys, 1, buffers)
+        for key in [key for key in subtree_cache if key[0] != "mesh" and key not in used_keys]:
+            del subtree_cache[key]
+    
+    @staticmethod
+    def _overlap_groups(boxes: List[Tuple[np.ndarray, np.ndarray]]) -> List[Tuple[List[int], np.ndarray, np.ndarray]]:
+        """
+        Union objects whose boxes overlap (touching is fine), as (object indices, box min, box max)
+        
+        Candidate pairs come from a sort and sweep along the axis where the
+        boxes overlap least: with the boxes sorted by their minimum, the ones
+        starting before box i ends follow it as one run. Only candidates are
+        tested on all three axes, so the cost follows the number of nearby
+        boxes rather than the square of the object count.
+        """
+        count = len(boxes)
+        lows = np.array([box[0] for box in boxes]).reshape(count, 3)
+        highs = np.array([box[1] for box in boxes]).reshape(count, 3)
+        
+        best = None
+        for axis in range(3):
+            order = np.argsort(lows[:, axis], kind='stable')
+            ends = np.searchsorted(lows[order, axis], highs[order, axis] - EPSILON, side='left')
+            runs = np.maximum(ends - np.arange(count) - 1, 0)
+            if best is None or runs.sum() < best[1].sum():
+                best = (order, runs)
+        order, runs = best
+        
+        group_of = list(range(count))
+        def find(i):
+            while group_of[i] != i:
+                group_of[i] = group_of[group_of[i]]
+                i = group_of[i]
+            return i
+        
+        # Candidates are expanded for a block of boxes at a time, keeping memory bounded
+        run_ends = np.cumsum(runs)
+        first = 0
+        while first < count:
+            limit = (run_ends[first - 1] if first else 0) + SWEEP_PAIRS
+            last = max(first + 1, int(np.searchsorted(run_ends, limit, side='right')))
+            block_runs = runs[first:last]
+            i = np.repeat(np.arange(first, last), block_runs)
+            j = i + 1 + np.arange(len(i)) - np.repeat(np.cumsum(block_runs) - block_runs, block_runs)
+            a, b = order[i], order[j]
+            hits = np.all((lows[a] < highs[b] - EPSILON) & (lows[b] < highs[a] - EPSILON), axis=1)
+            for p, q in zip(a[hits].tolist(), b[hits].tolist()):
+                group_of[find(p)] = find(q)
+            first = last
+        
+        members = {}
+        for i in range(count):
+            members.setdefault(find(i), []).append(i)
+        return [(indices, lows[indices].min(axis=0), highs[indices].max(axis=0)) for indices in members.values()]
+    
+    @staticmethod
+    def _separating_plane(groups: list) -> Optional[Tuple[int, float, list, list]]:
+        """
+        Find the most balanced axis-aligned plane with every group's box on one side
+        
+        Returns:
+            (axis, position, groups below, groups above), or None if there is none
+        """
+        best = None
+        for axis in range(3):
+            order = sorted(range(len(groups)), key=lambda g: groups[g][1][axis])
+            reach = -np.inf  # Highest box maximum among the groups below the candidate
+            for k in range(1, len(order)):
+                reach = max(reach, groups[order[k - 1]][2][axis])
+                low = groups[order[k]][1][axis]
+                imbalance = abs(len(order) - 2 * k)
+                if reach <= low and (best is None or imbalance < best[0]):
+                    best = (imbalance, axis, (reach + low) / 2, order[:k], order[k:])
+        if best is None:
+            return None
+        _, axis, position, below, above = best
+        return axis, position, [groups[g] for g in below], [groups[g] for g in above]
+    
+    def _build_object_level(self, objects: List[SceneObject], groups: list, subtree_cache: dict,
+                            used_keys: set, depth: int, buffers: Optional[SceneBuffers]) -> Optional[BSPNode]:
+        """Build the splitter nodes above `groups` and import the per-group trees below them"""
+        if len(groups) > 1:
+            split = self._separating_plane(groups)
+            if split is None:
+                # No axis-aligned plane separates these groups; they share one tree
+                indices = sorted(i for group in groups for i in group[0])
+                return self._group_subtree(objects, indices, subtree_cache, used_keys, depth, buffers)
+            
+            axis, position, below, above = split
+            plane = np.zeros(4)
+            plane[axis] = 1.0
+            plane[3] = -position
+            node = BSPNode(plane=plane)
+            self.node_count += 1
+            self.depth = max(self.depth, depth)
+            node.front = self._build_object_level(objects, above, subtree_cache, used_keys, depth + 1, buffers)
+            node.back = self._build_object_level(objects, below, subtree_cache, used_keys, depth + 1, buffers)
+            return node
+        
+        return self._group_subtree(objects, groups[0][0], subtree_cache, used_keys, depth, buffers)
+    
+    def _group_subtree(self, objects: List[SceneObject], indices: List[int], subtree_cache: dict,
+                       used_keys: set, depth: int, buffers: Optional[SceneBuffers]) -> Optional[BSPNode]:
+        """Import the tree of one group of objects, building it first if it is not cached"""
+        group = [objects[i] for i in indices]
+        if len(group) == 1:
+            obj = group[0]
+            if isinstance(obj, Instance):
+                # Shared by every instance of the mesh, in object space
+                key = ("mesh", obj.getMeshKey())
+                shape, matrix = obj.mesh, obj.modelMatrix
+            else:
+                key = ("object", id(obj))
+                shape, matrix = obj, None
+            if key not in subtree_cache:
+                subtree_cache[key] = (shape, self._build_packed([shape]))
+            packed = subtree_cache[key][1]
+            used_keys.add(key)
+        else:
+            # The cache holds the objects themselves, so their ids stay unique while the entry exists
+            key = ("group",) + tuple(id(obj) for obj in group)
+            if key not in subtree_cache:
+                subtree_cache[key] = (group, self._build_packed(group, buffers))
+            packed = subtree_cache[key][1]
+            matrix = None
+            used_keys.add(key)
+        
+        if packed is None:
+            return None
+        parents = [group[0]] if len(group) == 1 else group
+        return self._import_subtree(packed, parents, depth - 1, matrix)
+    
+    def _build_packed(self, shapes: List[SceneObject], buffers: Optional[SceneBuffers] = None) -> Optional[tuple]:
+        """Build a tree over the faces of `shapes` with this tree's settings and pack it"""
+        tree = BSPTree(self.strategy, self.sample_size, self.split_weight, self.balance_weight,
+                       self.seed, self.workers, self.parallel_threshold)
+        faces = extract_faces(shapes, tree.face_table, buffers)
+        if not faces:
+            return None
+        
+        if tree.workers != 0 and len(faces) >= 2 * tree.parallel_threshold:
+            root = tree.build_tree_parallel(faces, tree.workers)
+        else:
+            root = tree.build_tree(faces)
+        shape_indices = {id(shape): i for i, shape in enumerate(shapes)}
+        return _export_subtree(tree, root, [shape_indices[id(parent)] for parent in tree.face_table.parents])
+    
+    def insert_objects(self, objects: List[SceneObject], buffers: Optional[SceneBuffers] = None):
+        """
+        Add the faces of new objects to the existing tree
+        
+        Every face is filtered down from the root: it is split by the planes it
+        straddles and its pieces continue into the matching subtrees. Pieces
+        that reach an empty child slot are built into a new subtree there.
+        
+        Args:
+            objects: Objects to add
+            buffers: Packed buffers of the scene the objects belong to, see extract_faces
+        """
+        faces = extract_faces(objects, self.face_table, buffers)
+        if not faces:
+            return
+        
+        node_count = self.node_count
+        if self.root is None:
+            self.root = self._mark_inserted(self.build_tree(faces))
+        else:
+            stack = [(self.root, faces, 1)]
+            while stack:
+                node, face_list, depth = stack.pop()
+                front_list = []
+                back_list = []
+                for face in face_list:
+                    front_part, back_part = split_face(node.plane, face)
+                    if front_part:
+                        front_list.append(front_part)
+                    if back_part:
+                        back_list.append(back_part)
+                    if front_part and back_part:
+                        self.split_count += 1
+                
+                if front_list:
+                    if node.front is None:
+                        node.front = self._mark_inserted(self.build_tree(front_list, depth + 1))
+                    else:
+                        stack.append((node.front, front_list, depth + 1))
+                if back_list:
+                    if node.back is None:
+                        node.back = self._mark_inserted(self.build_tree(back_list, depth + 1))
+                    else:
+                        stack.append((node.back, back_list, depth + 1))
+        self.inserted_nodes += self.node_count - node_count
+    
+    @staticmethod
+    def _mark_inserted(root: BSPNode) -> BSPNode:
+        """Flag every node of a subtree built by insert_objects, so remove_objects can uncount it"""
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node.inserted = True
+            stack.extend(child for child in (node.front, node.back) if child is not None)
+        return root
+    
+    def remove_objects(self, objects: List[SceneObject]):
+        """
+        Remove all faces (and fragments) of the given objects from the tree
+        
+        A node that loses its polygon keeps its plane while both of its
+        children are still there, since the plane orders them; otherwise it
+        is replaced by its only child or dropped.
+        """
+        removed = {id(obj) for obj in objects}
+        if self.root is None or not removed:
+            return
+        
+        # Post-order walk: (node, parent, True if it is the front child, children done)
+        holder = BSPNode()
+        holder.front = self.root
+        stack = [(self.root, holder, True, False)]
+        while stack:
+            node, parent, is_front, done = stack.pop()
+            if not done:
+                stack.append((node, parent, is_front, True))
+                if node.back is not None:
+                    stack.append((node.back, node, False, False))
+                if node.front is not None:
+                    stack.append((node.front, node, True, False))
+                continue
+            
+            if node.polygon is not None and id(node.polygon.parent_object) in removed:
+                node.polygon = None
+                node.pruned = True
+                self.pruned_nodes += 1
+                self.face_count -= 1
+            if node.polygon is None and (node.front is None or node.back is None):
+                replacement = node.front if node.front is not None else node.back
+                if is_front:
+                    parent.front = replacement
+                else:
+                    parent.back = replacement
+                self.node_count -= 1
+                if node.pruned:
+                    self.pruned_nodes -= 1
+                if node.inserted:
+                    self.inserted_nodes -= 1
+        self.root = holder.front
+    
+    def degradation(self) -> float:
+        """Share of nodes that a fresh build would not have (inserted later, or pruned to a bare plane)"""
+        return (self.inserted_nodes + self.pruned_nodes) / max(self.node_count, 1)
     
     def traverse_back_to_front(self, node: BSPNode, camera_position: np.ndarray, result: List[Face] = None):
         """
         Traverse the BSP tree from back to front relative to a camera position
         
+        The walk uses an explicit stack, so degenerate (very deep) trees do not
+        hit the recursion limit.
+        
         Args:
-            node: The current node being traversed
+            node: The node to start the traversal from
             camera_position: The position of the camera
             result: List to fill with faces in back-to-front order
         
@@ -440,104 +1116,760 @@ class BSPTree:
         """
         if result is None:
             result = []
+        
+        # Entries are nodes to visit, or (node,) tuples marking a polygon to emit
+        stack = [node]
+        while stack:
+            entry = stack.pop()
+            if entry is None:
+                continue
+            if isinstance(entry, tuple):
+                result.append(entry[0].polygon)
+                continue
+            if entry.polygon is None:
+                # Splitter node of the object level: order the children only
+                if entry.plane is not None:
+                    side = np.dot(entry.plane[:3], camera_position[:3]) + entry.plane[3]
+                    stack.extend((entry.front, entry.back) if side > 0 else (entry.back, entry.front))
+                continue
             
-        if node is None:
-            return result
-            
-        # Classify camera position relative to the node's plane
-        if node.polygon is not None:
-            classification = node.polygon.classify_point(camera_position)
+            # Classify camera position relative to the node's plane
+            classification = entry.polygon.classify_point(camera_position)
+            facing = np.dot(entry.polygon.normal, camera_position[:3] - entry.polygon.vertices[0][:3])
             
             if classification > 0:  # Camera is in front of the plane
-                # Process the back side first, then the node, then the front side
-                self.traverse_back_to_front(node.back, camera_position, result)
-                
-                # Add the current polygon
-                # Check if it faces the camera (back-face culling)
-                if np.dot(node.polygon.normal, camera_position[:3] - node.polygon.vertices[0][:3]) > 0:
-                    result.append(node.polygon)
-                
-                self.traverse_back_to_front(node.front, camera_position, result)
+                # Process the back side first, then the node (if it faces the camera), then the front side
+                stack.append(entry.front)
+                if facing > 0:
+                    stack.append((entry,))
+                stack.append(entry.back)
             else:  # Camera is behind the plane
-                # Process the front side first, then the node, then the back side
-                self.traverse_back_to_front(node.front, camera_position, result)
-                
-                # Add the current polygon
-                # For back facing polygons, we need to check if it faces away from the camera
-                if np.dot(node.polygon.normal, camera_position[:3] - node.polygon.vertices[0][:3]) < 0:
-                    result.append(node.polygon)
-                
-                self.traverse_back_to_front(node.back, camera_position, result)
+                # Process the front side first, then the node (if it faces away), then the back side
+                stack.append(entry.back)
+                if facing < 0:
+                    stack.append((entry,))
+                stack.append(entry.front)
         
         return result
 
+def _build_subtree(params: tuple, planes: np.ndarray, colors: np.ndarray, sizes: np.ndarray,
+                   vertices: np.ndarray, parent_ids: list, depth: int) -> tuple:
+    """
+    Worker process side of BSPTree.build_tree_parallel
+    
+    Rebuilds the exported faces in a local table (keeping their planes), builds
+    their subtree serially and returns it as plain arrays: child links and
+    face rows per node in pre-order, the local face table and statistics.
+    """
+    table = FaceTable.from_arrays(planes, colors, np.concatenate(([0], np.cumsum(sizes)[:-1])), sizes,
+                                  np.arange(len(vertices), dtype=np.int64), vertices, list(parent_ids))
+    tree = BSPTree(*params)
+    tree.face_table = table
+    root = tree.build_tree([Face(table, row) for row in range(len(sizes))], depth)
+    return _export_subtree(tree, root, table.parents)
+
+def _flatten_tree(root: Optional[BSPNode]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Face]]:
+    """
+    Lay a pointer-based tree out in pre-order with an iterative walk
+    
+    Returns:
+        (planes, front, back, polygons, faces) as taken by FlatBSPTree
+    """
+    planes, front, back, polygons, faces = [], [], [], [], []
+    
+    # (node, parent index, True if this is the front child)
+    stack = [(root, -1, False)] if root is not None else []
+    while stack:
+        node, parent, is_front = stack.pop()
+        index = len(planes)
+        if parent >= 0:
+            (front if is_front else back)[parent] = index
+        
+        planes.append(node.plane)
+        front.append(-1)
+        back.append(-1)
+        if node.polygon is not None:
+            polygons.append(len(faces))
+            faces.append(node.polygon)
+        else:
+            polygons.append(-1)
+        
+        # Back is pushed first so the front subtree is laid out right after its parent
+        if node.back is not None:
+            stack.append((node.back, index, False))
+        if node.front is not None:
+            stack.append((node.front, index, True))
+    
+    return (np.array(planes, dtype=np.float64).reshape(-1, 4),
+            np.array(front, dtype=np.int32),
+            np.array(back, dtype=np.int32),
+            np.array(polygons, dtype=np.int32),
+            faces)
+
+def _export_subtree(tree: 'BSPTree', root: BSPNode, parent_ids: list) -> tuple:
+    """
+    Pack a subtree whose faces live in `tree.face_table` into plain arrays
+    
+    The result holds the child links and face row of every node in pre-order,
+    the face table (with `parent_ids` in place of the parent objects) and the
+    statistics of `tree`; BSPTree._import_subtree turns it back into nodes.
+    """
+    table = tree.face_table
+    # Only the layout is needed; a FlatBSPTree would also want the parent objects, which are ids here
+    _, front, back, polygons, faces = _flatten_tree(root)
+    rows = np.array([faces[p].index for p in polygons.tolist()], dtype=np.int64)
+    return (front, back, rows, table.planes, table.colors, table.sizes,
+            table.vertex_ids, table.pool.data, parent_ids,
+            tree.node_count, tree.split_count, tree.face_count, tree.depth)
+
+class FlatBSPTree:
+    """
+    Compact array form of a BSP tree
+    
+    Node i stores its plane in `planes[i]`, its children in `front[i]` and
+    `back[i]` (-1 when missing) and its polygon in `polygons[i]`, an index into
+    `faces` (-1 for nodes that only partition space). Nodes are stored in
+    pre-order, so the subtree of node i occupies [i, i + subtree_sizes[i]).
+    
+    `bounds[i]` is the (min, max) corner pair of the box around all polygons
+    of the subtree of node i, and `polygon_bounds[i]` the box of node i's own
+    polygon; both are used for frustum culling.
+    """
+    
+    def __init__(self, planes: np.ndarray, front: np.ndarray, back: np.ndarray,
+                 polygons: np.ndarray, faces: List[Face]):
+        self.planes = planes
+        self.front = front
+        self.back = back
+        self.polygons = polygons
+        self.faces = faces
+        self.face_rows = np.array([face.index for face in faces], dtype=np.int64)  # Face table row of every face
+        self.subtree_sizes = self._subtree_sizes()
+        self._links = (self.front.tolist(), self.back.tolist(), self.polygons.tolist())  # For fast scalar access
+        self.polygon_bounds, self.bounds = self._bounds()
+        self.face_nodes, self.face_orientations, self.face_objects, self.object_count = self._orientations()
+        
+        # State of the last traversal: camera side of every plane, the order,
+        # where each node's subtree starts in it, how many polygons the subtree
+        # emitted and where the node's own polygon went
+        self.sides = None
+        self._order = None
+        self.order_starts = None
+        self.emitted_counts = None
+        self.order_positions = None
+        self.culled_count = 0  # Polygons removed by the last cull()
+        self.back_face_count = 0  # Polygons removed by the last cull_back_faces()
+        self.last_update = None  # 'full', 'partial' or 'reused'
+        self.rewalked_nodes = 0
+    
+    @classmethod
+    def from_tree(cls, root: Optional[BSPNode]) -> 'FlatBSPTree':
+        """Flatten a pointer-based tree with an iterative pre-order walk"""
+        return cls(*_flatten_tree(root))
+    
+    def to_tree(self) -> Optional[BSPNode]:
+        """Rebuild the pointer-based tree (sharing planes and faces) and return its root"""
+        nodes = [BSPNode(polygon=self.faces[p] if p >= 0 else None, plane=plane)
+                 for p, plane in zip(self.polygons.tolist(), self.planes)]
+        for node, front, back in zip(nodes, self.front.tolist(), self.back.tolist()):
+            node.front = nodes[front] if front >= 0 else None
+            node.back = nodes[back] if back >= 0 else None
+        return nodes[0] if nodes else None
+    
+    @property
+    def node_count(self) -> int:
+        return len(self.planes)
+    
+    def _subtree_sizes(self) -> np.ndarray:
+        """Number of nodes in every subtree, accumulated children-first over the pre-order"""
+        sizes = np.ones(self.node_count, dtype=np.int32)
+        for i in range(self.node_count - 1, -1, -1):
+            if self.front[i] >= 0:
+                sizes[i] += sizes[self.front[i]]
+            if self.back[i] >= 0:
+                sizes[i] += sizes[self.back[i]]
+        return sizes
+    
+    def _bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Boxes of every node's polygon and of every subtree, as (n, 2, 3) min/max corners"""
+        polygon_bounds = np.empty((self.node_count, 2, 3))
+        polygon_bounds[:, 0] = np.inf
+        polygon_bounds[:, 1] = -np.inf
+        nodes = np.flatnonzero(self.polygons >= 0)
+        if len(nodes):
+            vertices, sizes = self.face_vertices(self.polygons[nodes])
+            offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            polygon_bounds[nodes, 0] = np.minimum.reduceat(vertices[:, :3], offsets)
+            polygon_bounds[nodes, 1] = np.maximum.reduceat(vertices[:, :3], offsets)
+        
+        # Children come after their parent in pre-order, so accumulate backwards
+        bounds = polygon_bounds.copy()
+        front, back, _ = self._links
+        for i in range(self.node_count - 1, -1, -1):
+            for child in (front[i], back[i]):
+                if child >= 0:
+                    np.minimum(bounds[i, 0], bounds[child, 0], out=bounds[i, 0])
+                    np.maximum(bounds[i, 1], bounds[child, 1], out=bounds[i, 1])
+        return polygon_bounds, bounds
+    
+    def _orientations(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """
+        Per-face data for back-face culling
+        
+        Face winding differs between primitive types, so the outward side of
+        each node plane is measured instead: primitives are convex, so their
+        centroid lies behind the plane of any of their faces (or fragments of
+        one) when its normal points outward.
+        
+        Returns:
+            (face_nodes, face_orientations, face_objects, object_count): the
+            node holding every face, +1/-1 when the node plane's normal points
+            out of/into the face's object (0 when degenerate), and the index
+            of the face's object among the `object_count` objects of the tree
+        """
+        face_count = len(self.faces)
+        face_nodes = np.zeros(face_count, dtype=np.int64)
+        orientations = np.zeros(face_count, dtype=np.int8)
+        face_objects = np.zeros(face_count, dtype=np.int64)
+        nodes = np.flatnonzero(self.polygons >= 0)
+        if len(nodes) == 0:
+            return face_nodes, orientations, face_objects, 0
+        
+        indices = self.polygons[nodes]
+        face_nodes[indices] = nodes
+        object_indices, centroids = {}, []
+        for i, face in zip(indices.tolist(), (self.faces[p] for p in indices.tolist())):
+            parent = face.parent_object
+            index = object_indices.get(id(parent))
+            if index is None:
+                index = object_indices[id(parent)] = len(centroids)
+                centroids.append(np.mean(np.asarray(parent.vertices, dtype=np.float64)[:, :3], axis=0))
+            face_objects[i] = index
+        
+        points = np.array(centroids)[face_objects[indices]]
+        distances = np.einsum('ij,ij->i', self.planes[nodes, :3], points) + self.planes[nodes, 3]
+        orientations[indices] = -np.sign(distances)
+        return face_nodes, orientations, face_objects, len(centroids)
+    
+    def face_vertices(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gather the vertices of several faces back to back
+        
+        Args:
+            indices: Indices into `faces`, such as a rendering order
+        
+        Returns:
+            (vertices, sizes): the (V, 4) world-space vertices of the faces in
+            the given order and the vertex count of each face
+        """
+        if len(indices) == 0:
+            return np.empty((0, 4)), np.empty(0, dtype=np.int64)
+        # All faces of a tree live in one table
+        table = self.faces[0].table
+        rows = self.face_rows[indices]
+        sizes = table.sizes[rows]
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        ids = table.vertex_ids[np.repeat(table.offsets[rows] - offsets, sizes) + np.arange(sizes.sum())]
+        return table.pool.data[ids], sizes
+    
+    def depth(self) -> int:
+        """Maximum depth of the tree (1 for a single node), computed without recursion"""
+        if self.node_count == 0:
+            return 0
+        depths = np.ones(self.node_count, dtype=np.int32)
+        # Parents come before their children in pre-order
+        for i in range(self.node_count):
+            if self.front[i] >= 0:
+                depths[self.front[i]] = depths[i] + 1
+            if self.back[i] >= 0:
+                depths[self.back[i]] = depths[i] + 1
+        return int(depths.max())
+    
+    def traverse_back_to_front(self, camera_position: np.ndarray) -> np.ndarray:
+        """
+        Return the indices of `faces` in back-to-front (painter) order
+        
+        The camera is classified against every node plane in one array
+        operation. A node's polygon is emitted unless the camera lies exactly
+        on its plane, which matches the facing test of
+        BSPTree.traverse_back_to_front.
+        
+        The order only depends on which side of each plane the camera is on,
+        so the sides and the order of the previous call are kept. When no
+        side changed, the previous order is returned as is; otherwise only the
+        subtrees under the planes that were crossed are walked again, in
+        place (every subtree occupies a contiguous range of the order).
+        The returned array is read-only and owned by the tree.
+        """
+        if self.node_count == 0:
+            return np.empty(0, dtype=np.int32)
+        
+        sides = np.sign(self.planes[:, :3] @ camera_position[:3] + self.planes[:, 3]).astype(np.int8)
+        changed = np.flatnonzero(sides != self.sides) if self.sides is not None else None
+        
+        if changed is not None and len(changed) == 0:
+            self.last_update = 'reused'
+            self.rewalked_nodes = 0
+        elif changed is not None and np.all(sides[changed] * self.sides[changed] < 0):
+            # Only strict flips, so every subtree keeps its number of emitted polygons
+            self.sides = sides
+            self.last_update = 'partial'
+            roots = []
+            end = 0
+            for i in changed.tolist():  # Pre-order, so the topmost crossed planes come first
+                if i >= end:
+                    roots.append(i)
+                    end = i + self.subtree_sizes[i]
+            side_list = sides.tolist()
+            for i in roots:
+                self._walk(i, self.order_starts[i], side_list)
+            self.rewalked_nodes = int(self.subtree_sizes[roots].sum())
+        else:
+            self.sides = sides
+            self.last_update = 'full'
+            emitted = (self.polygons >= 0) & (sides != 0)
+            self._order = np.empty(np.count_nonzero(emitted), dtype=np.int32)
+            self.order_starts = np.zeros(self.node_count, dtype=np.int64)
+            self.order_positions = np.full(self.node_count, -1, dtype=np.int64)
+            # Polygons emitted by each subtree; strict flips later do not change these
+            emitted_before = np.concatenate(([0], np.cumsum(emitted)))
+            nodes = np.arange(self.node_count)
+            self.emitted_counts = emitted_before[nodes + self.subtree_sizes] - emitted_before[nodes]
+            self._walk(0, 0, sides.tolist())
+            self.rewalked_nodes = self.node_count
+        
+        order = self._order.view()
+        order.flags.writeable = False
+        return order
+    
+    def cull(self, order: np.ndarray, frustum_planes: np.ndarray) -> np.ndarray:
+        """
+        Drop the polygons outside a frustum from an order returned by traverse_back_to_front
+        
+        The tree is walked from the root one level at a time, and only the
+        boxes of the nodes reached are classified against the planes, one
+        batch per level. Subtrees entirely outside are skipped (their range
+        of the order is dropped) and subtrees entirely inside are kept as is;
+        only subtrees that straddle a plane are descended into, testing the
+        box of each node's own polygon on the way.
+        
+        Args:
+            order: The current order of this tree
+            frustum_planes: (P, 4) world-space planes, inside where a*x + b*y + c*z + d >= 0
+        """
+        if self.node_count == 0 or len(order) == 0:
+            self.culled_count = 0
+            return order
+        
+        normals = frustum_planes[:, :3]
+        positive = normals > 0
+        def classify(boxes):
+            # Corner of each box furthest along (and against) every plane normal, (n, P)
+            far = np.where(positive, boxes[:, None, 1], boxes[:, None, 0])
+            near = np.where(positive, boxes[:, None, 0], boxes[:, None, 1])
+            outside = np.any(np.einsum('npk,pk->np', far, normals) + frustum_planes[:, 3] < 0, axis=1)
+            inside = np.all(np.einsum('npk,pk->np', near, normals) + frustum_planes[:, 3] >= 0, axis=1)
+            return outside, inside
+        
+        # +1 where a dropped range starts, -1 where it ends
+        marks = np.zeros(len(order) + 1, dtype=np.int32)
+        starts = self.order_starts
+        counts = self.emitted_counts
+        level = np.zeros(1, dtype=np.int64)
+        while len(level):
+            # Boxes of nodes without polygons are empty (infinite corners) and never outside or inside
+            with np.errstate(invalid='ignore'):
+                outside, inside = classify(self.bounds[level])
+            dropped = level[outside]
+            np.add.at(marks, starts[dropped], 1)
+            np.add.at(marks, starts[dropped] + counts[dropped], -1)
+            
+            straddling = level[~outside & ~inside]
+            emitting = straddling[(self.polygons[straddling] >= 0) & (self.sides[straddling] != 0)]
+            with np.errstate(invalid='ignore'):
+                polygon_outside, _ = classify(self.polygon_bounds[emitting])
+            positions = self.order_positions[emitting[polygon_outside]]
+            np.add.at(marks, positions, 1)
+            np.add.at(marks, positions + 1, -1)
+            
+            children = np.concatenate((self.front[straddling], self.back[straddling]))
+            level = children[children >= 0]
+        
+        keep = np.cumsum(marks[:-1]) == 0
+        self.culled_count = len(order) - int(np.count_nonzero(keep))
+        return order[keep]
+    
+    def cull_back_faces(self, order: np.ndarray) -> np.ndarray:
+        """
+        Drop the polygons facing away from the camera from an order of this tree
+        
+        Uses the camera sides of the last traverse_back_to_front call, so the
+        visibility mask of all faces is one array operation. Objects the
+        camera is inside have no face towards it; they are kept whole so they
+        can still be seen from within.
+        
+        For closed objects the dropped faces are hidden behind the kept ones,
+        so the visible faces do not change. What does change is that the
+        outlines of the dropped faces are no longer drawn, which moves a few
+        pixels along silhouettes. Also, renderers that number or color faces
+        by their position in the order only count the drawn faces.
+        
+        Args:
+            order: An order returned by traverse_back_to_front (or cull)
+        """
+        if len(order) == 0:
+            self.back_face_count = 0
+            return order
+        
+        front_facing = self.sides[self.face_nodes] * self.face_orientations >= 0
+        surrounding = np.bincount(self.face_objects[front_facing], minlength=self.object_count) == 0
+        visible = front_facing | surrounding[self.face_objects]
+        
+        kept = order[visible[order]]
+        self.back_face_count = len(order) - len(kept)
+        return kept
+    
+    def _walk(self, root: int, position: int, sides: List[int]):
+        """
+        Write the back-to-front order of the subtree at `root` into the order, starting at `position`
+        
+        Args:
+            root: Node whose subtree is walked
+            position: Index in the order of the first polygon of the subtree
+            sides: The camera side of every node plane as a list, converted
+                once per traversal rather than for every walked subtree
+        """
+        order = self._order
+        starts = self.order_starts
+        positions = self.order_positions
+        front, back, polygons = self._links
+        
+        # Non-negative entries are nodes to visit, ~i marks the polygon of node i to emit
+        count = position
+        stack = [root]
+        while stack:
+            i = stack.pop()
+            if i < 0:
+                order[count] = polygons[~i]
+                positions[~i] = count
+                count += 1
+                continue
+            
+            # The subtree of i is emitted contiguously from here
+            starts[i] = count
+            side = sides[i]
+            if side > 0:  # Camera in front: back subtree, node, front subtree
+                near, far = front[i], back[i]
+            else:  # Camera behind: front subtree, node, back subtree
+                near, far = back[i], front[i]
+            if near >= 0:
+                stack.append(near)
+            if side != 0 and polygons[i] >= 0:
+                stack.append(~i)
+            if far >= 0:
+                stack.append(far)
+
 class PainterBSP:
     """
     Painter's Algorithm using BSP tree for correct depth ordering
     This class manages the rendering order of 3D objects
     """
     
-    def __init__(self):
-        self.bsp_tree = BSPTree()
-        self.last_camera_position = None
+    def __init__(self, strategy: str = "scored", cache_dir: Optional[str] = None, workers: int = 0,
+                 two_level: bool = True, incremental: bool = True, rebalance_threshold: float = 0.5):
+        """
+        Args:
+            strategy: Partition strategy used to build the tree, see PARTITION_STRATEGIES
+            cache_dir: Directory for compiled trees keyed by scene content (see
+                bsp_cache); None disables the on-disk cache
+            workers: Worker processes for building large trees, see BSPTree
+            two_level: Build per-object trees under an object level (see
+                BSPTree.create_two_level) instead of one tree of all faces
+            incremental: Apply added and removed objects to the existing tree
+                instead of rebuilding it
+            rebalance_threshold: Rebuild instead once the tree's degradation
+                (see BSPTree.degradation) would exceed this
+        """
+        self.strategy = strategy
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.two_level = two_level
+        self.incremental = incremental
+        self.rebalance_threshold = rebalance_threshold
+        self.tree_objects = []  # Objects the current tree was built from, in scene order
+        self.subtree_cache = {}  # Per-mesh and per-group trees reused between builds
+        self.bsp_tree = BSPTree(strategy, workers=workers)
+        self.flat_tree = FlatBSPTree.from_tree(None)  # Array form used for per-frame traversal
         self.layer_count = 0
+        self.scene_version = None  # Scene version the current tree was built for
         
         # Statistics for debugging
         self.stats = {
             'total_faces': 0,
             'tree_depth': 0,
+            'node_count': 0,
+            'split_count': 0,
             'build_time': 0,
-            'traverse_time': 0
+            'traverse_time': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'disk_cache_hits': 0,
+            'incremental_updates': 0,
+            'rebalances': 0,
+            'culled_faces': 0,  # Faces outside the view frustum in the last order
+            'back_faces': 0,  # Faces facing away from the camera in the last order
+            'order_update': None,  # How the last order was produced: 'full', 'partial' or 'reused'
+            'rewalked_nodes': 0
         }
     
-    def build_bsp_tree(self, objects: List[SceneObject]):
-        """Build a BSP tree from scene objects"""
+    def build_bsp_tree(self, objects: List[SceneObject], scene_version: Optional[int] = None,
+                       buffers: Optional[SceneBuffers] = None):
+        """
+        Build a BSP tree from scene objects
+        
+        Args:
+            objects: Scene objects in world space
+            scene_version: Version/generation of the scene the objects come from.
+                The tree is static in world space, so when this matches the
+                version of the current tree it is reused instead of rebuilt.
+                Otherwise added and removed objects are applied to the
+                current tree when `incremental` is set, or, with a cache_dir,
+                a tree compiled earlier for the same scene content is loaded
+                from disk.
+            buffers: Packed buffers of the scene (Scene.getBuffers()); world-space
+                faces are then taken from them instead of transforming the
+                objects again
+        """
+        if scene_version is not None and scene_version == self.scene_version:
+            self.stats['cache_hits'] += 1
+            return
+        self.stats['cache_misses'] += 1
+        
         # Time the tree building process
         start_time = time.time()
         
-        # Build the tree
-        self.bsp_tree.create_from_objects(objects)
+        if self.incremental and self.bsp_tree.root is not None and self._update_tree(objects, buffers):
+            self.scene_version = scene_version
+            self.stats['incremental_updates'] += 1
+            self.stats['build_time'] = time.time() - start_time
+            return
+        
+        self.tree_objects = list(objects)
+        # Build a fresh tree, unless the same scene was compiled before
+        self.bsp_tree = BSPTree(self.strategy, workers=self.workers)
+        self.scene_version = scene_version
+        key = None
+        if self.cache_dir is not None:
+            key = bsp_cache.scene_key(objects, self._tree_params())
+            if self._load_cached_tree(key, objects):
+                self.stats['disk_cache_hits'] += 1
+                self.stats['build_time'] = time.time() - start_time
+                return
+        
+        if self.two_level:
+            self.bsp_tree.create_two_level(objects, self.subtree_cache, buffers)
+        else:
+            self.bsp_tree.create_from_objects(objects, buffers)
+        self.flat_tree = FlatBSPTree.from_tree(self.bsp_tree.root)
         
         # Calculate tree depth
         self.stats['tree_depth'] = self._calculate_tree_depth(self.bsp_tree.root)
         self.stats['total_faces'] = self.bsp_tree.face_count
+        self.stats['node_count'] = self.bsp_tree.node_count
+        self.stats['split_count'] = self.bsp_tree.split_count
         self.stats['build_time'] = time.time() - start_time
         
+        if key is not None:
+            self._save_cached_tree(key, objects)
+    
+    def _update_tree(self, objects: List[SceneObject], buffers: Optional[SceneBuffers] = None) -> bool:
+        """
+        Insert and remove the objects that differ from the current tree's
+        
+        Returns:
+            False when the tree should be rebuilt instead: the objects were
+            only reordered, or the update degraded the tree past rebalance_threshold
+        """
+        current = {id(obj) for obj in objects}
+        previous = {id(obj) for obj in self.tree_objects}
+        added = [obj for obj in objects if id(obj) not in previous]
+        removed = [obj for obj in self.tree_objects if id(obj) not in current]
+        if not added and not removed:
+            return False
+        
+        self.bsp_tree.remove_objects(removed)
+        self.bsp_tree.insert_objects(added, buffers)
+        self.tree_objects = list(objects)
+        if self.bsp_tree.degradation() > self.rebalance_threshold:
+            self.stats['rebalances'] += 1
+            return False
+        
+        self.flat_tree = FlatBSPTree.from_tree(self.bsp_tree.root)
+        self.bsp_tree.depth = self.flat_tree.depth()
+        self.stats['tree_depth'] = self.bsp_tree.depth
+        self.stats['total_faces'] = self.bsp_tree.face_count
+        self.stats['node_count'] = self.bsp_tree.node_count
+        self.stats['split_count'] = self.bsp_tree.split_count
+        return True
+    
+    def _tree_params(self) -> tuple:
+        """Everything besides the scene that determines the built tree"""
+        tree = self.bsp_tree
+        return (tree.strategy, tree.sample_size, tree.split_weight, tree.balance_weight, EPSILON, self.two_level)
+    
+    def _save_cached_tree(self, key: bytes, objects: List[SceneObject]):
+        """Write the current tree to the on-disk cache"""
+        table = self.bsp_tree.face_table
+        tree = self.flat_tree
+        object_indices = {id(obj): i for i, obj in enumerate(objects)}
+        counts = {
+            'node_count': tree.node_count,
+            'tree_face_count': len(tree.faces),
+            'face_count': table.count,
+            'id_count': table.id_count,
+            'vertex_count': table.pool.count,
+            'total_faces': self.stats['total_faces'],
+            'split_count': self.stats['split_count'],
+            'depth': self.stats['tree_depth'],
+        }
+        arrays = {
+            'node_planes': tree.planes,
+            'node_front': tree.front,
+            'node_back': tree.back,
+            'node_polygons': tree.polygons,
+            'tree_faces': [face.index for face in tree.faces],
+            'face_planes': table.planes,
+            'face_colors': table.colors,
+            'face_offsets': table.offsets,
+            'face_sizes': table.sizes,
+            'face_parents': [object_indices[id(parent)] for parent in table.parents],
+            'vertex_ids': table.vertex_ids,
+            'vertices': table.pool.data,
+        }
+        try:
+            bsp_cache.save(bsp_cache.cache_path(self.cache_dir, key), key, counts, arrays)
+            bsp_cache.prune(self.cache_dir, bsp_cache.MAX_ENTRIES)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not write BSP cache: {e}")
+    
+    def _load_cached_tree(self, key: bytes, objects: List[SceneObject]) -> bool:
+        """Memory-map a cached tree for this scene; returns False when there is none"""
+        try:
+            cached = bsp_cache.load(bsp_cache.cache_path(self.cache_dir, key), key)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read BSP cache: {e}")
+            cached = None
+        if cached is None:
+            return False
+        counts, arrays = cached
+        parents = arrays['face_parents']
+        if len(parents) and (parents.min() < 0 or parents.max() >= len(objects)):
+            print("Warning: Ignoring corrupt BSP cache entry")
+            return False
+        
+        table = FaceTable.from_arrays(
+            arrays['face_planes'], arrays['face_colors'], arrays['face_offsets'], arrays['face_sizes'],
+            arrays['vertex_ids'], arrays['vertices'], [objects[i] for i in parents.tolist()])
+        faces = [Face(table, index) for index in arrays['tree_faces'].tolist()]
+        self.flat_tree = FlatBSPTree(arrays['node_planes'], arrays['node_front'], arrays['node_back'],
+                                     arrays['node_polygons'], faces)
+        self.bsp_tree.face_table = table
+        self.bsp_tree.root = self.flat_tree.to_tree()
+        self.bsp_tree.face_count = counts['total_faces']
+        self.bsp_tree.node_count = counts['node_count']
+        self.bsp_tree.split_count = counts['split_count']
+        self.bsp_tree.depth = counts['depth']
+        
+        self.stats['tree_depth'] = counts['depth']
+        self.stats['total_faces'] = counts['total_faces']
+        self.stats['node_count'] = counts['node_count']
+        self.stats['split_count'] = counts['split_count']
+        return True
+    
+    def invalidate(self):
+        """Force the next build_bsp_tree call to rebuild the tree"""
+        self.scene_version = None
+    
+    def set_strategy(self, strategy: str):
+        """Select the partition strategy; the tree is rebuilt on the next build_bsp_tree call"""
+        if strategy not in PARTITION_STRATEGIES:
+            raise ValueError(f"Unknown partition strategy: {strategy}")
+        self.strategy = strategy
+        self.subtree_cache.clear()
+        self.invalidate()
+        
     def _calculate_tree_depth(self, node: BSPNode, current_depth: int = 1) -> int:
-        """Calculate the maximum depth of the BSP tree"""
+        """Calculate the maximum depth of the BSP tree (iteratively, safe for degenerate trees)"""
         if node is None:
             return 0
-            
-        # Get depth of front and back subtrees
-        front_depth = self._calculate_tree_depth(node.front, current_depth + 1) if node.front else current_depth
-        back_depth = self._calculate_tree_depth(node.back, current_depth + 1) if node.back else current_depth
         
-        # Return max depth between front and back subtrees
-        return max(front_depth, back_depth)
+        max_depth = current_depth
+        stack = [(node, current_depth)]
+        while stack:
+            node, depth = stack.pop()
+            max_depth = max(max_depth, depth)
+            if node.front:
+                stack.append((node.front, depth + 1))
+            if node.back:
+                stack.append((node.back, depth + 1))
         
-    def get_rendering_order(self, camera_position: np.ndarray) -> List[Face]:
+        return max_depth
+        
+    def get_rendering_order(self, camera_position: np.ndarray,
+                            frustum_planes: Optional[np.ndarray] = None,
+                            cull_back_faces: bool = False) -> List[Face]:
         """
         Get the faces in back-to-front order relative to camera position
         
         Args:
             camera_position: The position of the camera in world space
+            frustum_planes: Optional world-space planes (see FlatBSPTree.cull);
+                faces outside them are left out
+            cull_back_faces: Leave out faces facing away from the camera
             
         Returns:
             List of faces sorted in back-to-front order for correct rendering
         """
-        if self.bsp_tree.root is None:
-            return []
+        faces = self.flat_tree.faces
+        return [faces[i] for i in self.get_rendering_indices(camera_position, frustum_planes, cull_back_faces)]
+    
+    def get_rendering_indices(self, camera_position: np.ndarray,
+                              frustum_planes: Optional[np.ndarray] = None,
+                              cull_back_faces: bool = False) -> np.ndarray:
+        """
+        Get the indices of the tree's faces (see flat_tree.faces) in back-to-front order
         
+        Args:
+            camera_position: The position of the camera in world space
+            frustum_planes: Optional world-space planes; subtrees and faces
+                outside them are culled
+            cull_back_faces: Leave out faces facing away from the camera (see
+                FlatBSPTree.cull_back_faces)
+            
+        Returns:
+            Index array into flat_tree.faces in painter order (read-only when not culled)
+        """
         # Time the traversal
         start_time = time.time()
         
-        # Always recompute the rendering order
-        rendering_order = self.bsp_tree.traverse_back_to_front(self.bsp_tree.root, camera_position)
+        # The flat tree reuses the previous order for the planes the camera did not cross
+        rendering_order = self.flat_tree.traverse_back_to_front(camera_position)
         self.layer_count = len(rendering_order)
-        self.last_camera_position = camera_position.copy()
+        culled = 0
+        if frustum_planes is not None:
+            rendering_order = self.flat_tree.cull(rendering_order, frustum_planes)
+            culled = self.flat_tree.culled_count
+        back_faces = 0
+        if cull_back_faces:
+            rendering_order = self.flat_tree.cull_back_faces(rendering_order)
+            back_faces = self.flat_tree.back_face_count
         
         # Update statistics
         self.stats['traverse_time'] = time.time() - start_time
+        self.stats['order_update'] = self.flat_tree.last_update
+        self.stats['rewalked_nodes'] = self.flat_tree.rewalked_nodes
+        self.stats['culled_faces'] = culled
+        self.stats['back_faces'] = back_faces
         
         return rendering_order
         
@@ -6,14 +6,34 @@ from scene.Prism import Prism
 from scene.Cylinder import Cylinder
 from scene.Octahedron import Octahedron
 from render.projection import Projection
-from render.painter_bsp import PainterBSP, Face
+from render.painter_bsp import PainterBSP, PARTITION_STRATEGIES
+from render.clipping import getFrustumPlanes
+from render.text_cache import TextCache
 import pygame
 import numpy as np
-from typing import List
+from typing import Optional, Tuple
 import colorsys
 
+# Entries in the color lookup table of each color scheme
+PALETTE_SIZE = 1024
+
+# One drawn face: its slice of the screen vertex array, fill color, position in
+# the BSP order and the distance of its centroid to the camera
+SCREEN_FACE_DTYPE = np.dtype([
+    ('offset', np.int64),
+    ('size', np.int64),
+    ('color', np.uint8, (3,)),
+    ('bsp_layer', np.int64),
+    ('distance', np.float64),
+])
+
 class PainterRenderer:
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, bsp_cache_dir: Optional[str] = ".bsp_cache"):
+        """
+        Args:
+            width, height: Window size in pixels
+            bsp_cache_dir: Where compiled BSP trees are cached between runs (None disables it)
+        """
         # Initialize camera with better FOV and near/far planes
         self.camera = Camera(width, height, 90, 100, 0.1)  
         
@@ -29,7 +49,7 @@ class PainterRenderer:
         self.setupTestScene()
         
         self.projection = Projection(self.camera, self.scene)
-        self.painter_bsp = PainterBSP()
+        self.painter_bsp = PainterBSP(cache_dir=bsp_cache_dir)
 
         # Initialize pygame
         pygame.init()
@@ -64,12 +84,19 @@ class PainterRenderer:
         self.max_bsp_layers = 20  # Maximum BSP layers we expect
         self.color_schemes = ["rainbow", "heatmap", "blues"]
         self.color_scheme = "rainbow"  # Default color scheme
+        self.palettes = {scheme: self.build_palette(scheme) for scheme in self.color_schemes}
 
         # Debug info
         self.showDebugInfo = False
         self.showLayerNumbers = False  # Toggle for showing layer numbers on faces
+        self.frustumCulling = True  # Skip BSP subtrees outside the view frustum
+        self.redrawRequested = False  # Set by window events that need the frame presented again
+        self.statsIdle = True  # No scene calculation led to the drawn frame, so it has no per-frame stats
+        self.backFaceCulling = True  # Skip faces pointing away from the camera (and their outlines, see FlatBSPTree.cull_back_faces)
         self.font = pygame.font.SysFont('Arial', 16)
         self.small_font = pygame.font.SysFont('Arial', 12)
+        self.text = TextCache(self.font)  # Overlay text drawn from cached surfaces
+        self.small_text = TextCache(self.small_font)
 
         # Initial scene calculation
         self.calculateScene()
@@ -205,7 +232,7 @@ class PainterRenderer:
     def calculateScene(self):
         """Calculate all scene transformations and projections"""
         self.projection.projectCameraObjects()
-        self.screenFaces = self.prepareScreenFaces()
+        self.screenFaces, self.screenVertices = self.prepareScreenFaces()
 
     def get_color_for_bsp_layer(self, layer_index, total_layers):
         """
@@ -218,10 +245,48 @@ class PainterRenderer:
         Returns:
             RGB color tuple
         """
-        # Normalize layer index to 0-1 range
-        normalized_pos = layer_index / max(1, total_layers - 1)
+        r, g, b = self.get_colors_for_bsp_layers(np.array([layer_index]), total_layers)[0].tolist()
+        return (r, g, b)
+
+    def get_colors_for_bsp_layers(self, layer_indices: np.ndarray, total_layers: int) -> np.ndarray:
+        """
+        Colors of many BSP layers at once, looked up in the palette of the selected color scheme
         
-        if self.color_scheme == "rainbow":
+        Args:
+            layer_indices: Indices of the layers in BSP ordering (0 = furthest, higher = closer)
+            total_layers: Total number of layers in the scene
+            
+        Returns:
+            (N, 3) uint8 array of RGB colors
+        """
+        palette = self.palettes.get(self.color_scheme)
+        if palette is None:
+            palette = self.palettes[self.color_scheme] = self.build_palette(self.color_scheme)
+        
+        # Normalize layer indices to 0-1 range, then to the nearest palette entry
+        normalized_pos = np.asarray(layer_indices) / max(1, total_layers - 1)
+        entries = np.rint(np.clip(normalized_pos, 0.0, 1.0) * (PALETTE_SIZE - 1)).astype(np.intp)
+        return palette[entries]
+
+    @staticmethod
+    def build_palette(scheme: str) -> np.ndarray:
+        """Sample a color scheme into a (PALETTE_SIZE, 3) uint8 lookup table"""
+        colors = [PainterRenderer.scheme_color(scheme, i / (PALETTE_SIZE - 1)) for i in range(PALETTE_SIZE)]
+        return np.array(colors, dtype=np.uint8)
+
+    @staticmethod
+    def scheme_color(scheme: str, normalized_pos: float):
+        """
+        Color of a color scheme at a position in the BSP ordering
+        
+        Args:
+            scheme: Name of the color scheme
+            normalized_pos: Position from 0 (furthest layer) to 1 (closest layer)
+            
+        Returns:
+            RGB color tuple
+        """
+        if scheme == "rainbow":
             # Full rainbow spectrum (HSV color wheel)
             # Start with blue (240°), go through green, yellow, to red (0°)
             hue = (1 - normalized_pos) * 0.8  # Use 80% of the color wheel (blue to red)
@@ -230,7 +295,7 @@ class PainterRenderer:
             r, g, b = colorsys.hsv_to_rgb(hue, saturation, value)
             return (int(r * 255), int(g * 255), int(b * 255))
             
-        elif self.color_scheme == "heatmap":
+        elif scheme == "heatmap":
             # Heat map: blue (cold/far) to red (hot/close)
             if normalized_pos < 0.5:
                 # Blue to green (far to mid)
@@ -241,7 +306,7 @@ class PainterRenderer:
                 ratio = (normalized_pos - 0.5) * 2
                 return (int(ratio * 255), int((1 - ratio) * 255), 0)
                 
-        elif self.color_scheme == "blues":
+        elif scheme == "blues":
             # Different shades of blue - stronger contrast
             blue = int(180 + normalized_pos * 75)  # 180-255 range for blue
             green = int(normalized_pos * 200)      # 0-200 range for green
@@ -253,77 +318,70 @@ class PainterRenderer:
             gray = int(normalized_pos * 200) + 55  # 55-255 range
             return (gray, gray, gray)
 
-    def prepareScreenFaces(self) -> List[dict]:
+    def prepareScreenFaces(self) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Extract faces from objects, determine rendering order with BSP, and map to screen coordinates
+        Determine the rendering order with the BSP tree and map the ordered faces to screen coordinates
+        
+        The vertices of all ordered faces are gathered into one array and
+        transformed, divided and mapped to the viewport together.
         
         Returns:
-            List of face dictionaries with screen coordinates and colors
+            (faces, vertices): a SCREEN_FACE_DTYPE array with one entry per
+            drawn face in back-to-front order, and the (V, 2) screen
+            coordinates its `offset`/`size` fields point into
         """
         # Get the original objects
         original_objects = self.scene.getObjects()
         
-        # Re-build the BSP tree with original objects (world space)
-        # This needs to be done every frame to update rendering order
-        self.painter_bsp.build_bsp_tree(original_objects)
+        # The BSP tree is built in world space, so it is only rebuilt when the scene changes;
+        # its faces come from the scene's packed world-space vertices
+        self.painter_bsp.build_bsp_tree(original_objects, self.scene.version, self.scene.getBuffers())
         
         # Get the order of faces for rendering in back-to-front order
         # This will change based on camera position
-        faces_in_order = self.painter_bsp.get_rendering_order(self.camera.position)
-        total_faces = len(faces_in_order)
-        
-        # Project all vertices to screen space
-        screen_faces = []
-        
-        for i, face in enumerate(faces_in_order):
-            # Get color for this BSP layer - back-to-front order (0 = furthest back)
-            # This ensures colors update as the BSP ordering changes
-            color = self.get_color_for_bsp_layer(i, total_faces)
-            
-            # Map the face vertices to screen coordinates
-            screen_verts = []
-            vertices_behind_camera = 0
-            
-            for vert in face.vertices:
-                # Apply camera transformation to get to camera space
-                cam_space_vert = self.camera.CameraMatrix @ vert
-                
-                # Check if vertex is behind camera
-                if cam_space_vert[2] <= 0:
-                    vertices_behind_camera += 1
-                
-                # Apply projection to get to clip space
-                clip_space_vert = self.projection.getProjectionMatrix() @ cam_space_vert
-                
-                # Perspective divide to get to normalized device coordinates
-                if clip_space_vert[3] != 0:
-                    ndc = clip_space_vert / clip_space_vert[3]
-                else:
-                    ndc = clip_space_vert
-                
-                # Map to screen space (even if off-screen or behind camera)
-                screen_x = (ndc[0] + 1) * 0.5 * self.camera.width
-                screen_y = (1 - (ndc[1] + 1) * 0.5) * self.camera.height  # Y is flipped in screen space
-                
-                screen_verts.append((screen_x, screen_y))
-            
-            # Skip faces if ALL vertices are behind the camera
-            if vertices_behind_camera == len(face.vertices):
-                continue
-            
-            # Calculate distance to camera for debugging info
-            centroid = face.get_centroid()
-            distance = np.linalg.norm(centroid[:3] - self.camera.position[:3])
-            
-            # Store all data about this face
-            screen_faces.append({
-                'vertices': screen_verts,
-                'color': color,
-                'bsp_layer': i,
-                'distance': distance
-            })
-        
-        return screen_faces
+        frustum_planes = self.getFrustumPlanes() if self.frustumCulling else None
+        order = self.painter_bsp.get_rendering_indices(self.camera.position, frustum_planes, self.backFaceCulling)
+        total_faces = len(order)
+        vertices, sizes = self.painter_bsp.flat_tree.face_vertices(order)
+        offsets = np.zeros(total_faces, dtype=np.int64)
+        if total_faces > 1:
+            np.cumsum(sizes[:-1], out=offsets[1:])
+        
+        # Matrices are cached by the camera; read them once for the whole frame
+        camera_matrix = self.camera.CameraMatrix
+        projection_matrix = self.camera.getProjectionMatrix()
+        
+        # Camera space, then clip space and the perspective divide (skipped where w is 0)
+        cam_space = vertices @ camera_matrix.T
+        behind_camera = cam_space[:, 2] <= 0
+        clip_space = cam_space @ projection_matrix.T
+        w = clip_space[:, 3:]
+        ndc = np.divide(clip_space, w, out=clip_space.copy(), where=w != 0)
+        
+        # Map to screen space (even if off-screen or behind camera), Y is flipped in screen space
+        screen_vertices = np.empty((len(vertices), 2))
+        screen_vertices[:, 0] = (ndc[:, 0] + 1) * 0.5 * self.camera.width
+        screen_vertices[:, 1] = (1 - (ndc[:, 1] + 1) * 0.5) * self.camera.height
+        
+        # Skip faces if ALL vertices are behind the camera
+        if total_faces:
+            visible = np.add.reduceat(behind_camera, offsets, dtype=np.int64) < sizes
+            centroids = np.add.reduceat(vertices[:, :3], offsets) / sizes[:, None]
+        else:
+            visible = np.zeros(0, dtype=bool)
+            centroids = np.empty((0, 3))
+        layers = np.flatnonzero(visible)
+        
+        screen_faces = np.empty(len(layers), dtype=SCREEN_FACE_DTYPE)
+        screen_faces['offset'] = offsets[layers]
+        screen_faces['size'] = sizes[layers]
+        screen_faces['bsp_layer'] = layers
+        # Distance to camera for debugging info
+        screen_faces['distance'] = np.linalg.norm(centroids[layers] - self.camera.position[:3], axis=1)
+        # Color for each BSP layer - back-to-front order (0 = furthest back), so colors follow the ordering
+        screen_faces['color'] = self.get_colors_for_bsp_layers(layers, total_faces)
+        
+        return screen_faces, screen_vertices
 
     def drawScene(self):
         """Draw the pre-calculated scene using the Painter's Algorithm"""
@@ -331,13 +389,16 @@ class PainterRenderer:
         self.screen.fill((0, 0, 0))
         
         # Draw all faces in back-to-front order (already sorted by the BSP tree)
-        for face in self.screenFaces:
-            vertices = face['vertices']
+        faces = self.screenFaces
+        points = self.screenVertices.tolist()
+        for offset, size, color, layer in zip(faces['offset'].tolist(), faces['size'].tolist(),
+                                              faces['color'].tolist(), faces['bsp_layer'].tolist()):
+            vertices = points[offset:offset + size]
             
             # Draw the face as a filled polygon (only if it has enough vertices)
             try:
                 if len(vertices) >= 3:
-                    pygame.draw.polygon(self.screen, face['color'], vertices)
+                    pygame.draw.polygon(self.screen, color, vertices)
                     pygame.draw.polygon(self.screen, (255, 255, 255), vertices, 1)
                     
                     # Draw layer number if enabled
@@ -346,16 +407,12 @@ class PainterRenderer:
                         centroid_x = sum(v[0] for v in vertices) / len(vertices)
                         centroid_y = sum(v[1] for v in vertices) / len(vertices)
                         
-                        # Determine text color (inverted from face color for visibility)
-                        color = face['color']
-                        text_color = (255 - color[0], 255 - color[1], 255 - color[2])
-                        
-                        # Create text surface with layer number
-                        layer_text = self.small_font.render(str(face['bsp_layer']), True, text_color)
+                        # Determine text color (inverted from face color for visibility), rounded
+                        # to 16 levels per channel so a few cached digit atlases serve every face
+                        text_color = tuple((255 - c) // 16 * 16 + 8 for c in color)
                         
-                        # Draw text at face centroid
-                        text_rect = layer_text.get_rect(center=(centroid_x, centroid_y))
-                        self.screen.blit(layer_text, text_rect)
+                        # Draw layer number at face centroid
+                        self.small_text.draw(self.screen, str(layer), text_color, (centroid_x, centroid_y), center=True)
             except (ValueError, TypeError, pygame.error) as e:
                 # Skip problematic polygons - this can happen when vertices are outside view frustum
                 continue
@@ -370,17 +427,15 @@ class PainterRenderer:
     def drawDebugInfo(self):
         """Draw debug information on screen"""
         # Calculate some debug statistics
-        if self.screenFaces:
-            bsp_layers = max(face['bsp_layer'] for face in self.screenFaces) + 1
-            min_dist = min(face['distance'] for face in self.screenFaces)
-            max_dist = max(face['distance'] for face in self.screenFaces)
+        if len(self.screenFaces):
+            bsp_layers = int(self.screenFaces['bsp_layer'].max()) + 1
+            min_dist = self.screenFaces['distance'].min()
+            max_dist = self.screenFaces['distance'].max()
             dist_range = f"{min_dist:.1f} - {max_dist:.1f}"
             
             # Get depth order information
             depth_info = {}
-            for face in self.screenFaces:
-                layer = face['bsp_layer']
-                dist = face['distance']
+            for layer, dist in zip(self.screenFaces['bsp_layer'].tolist(), self.screenFaces['distance'].tolist()):
                 if layer not in depth_info:
                     depth_info[layer] = []
                 depth_info[layer].append(dist)
@@ -394,21 +449,35 @@ class PainterRenderer:
         
         # Get BSP statistics
         bsp_stats = self.painter_bsp.get_stats()
+        
+        # Frame rate and traversal are only measured while frames are being calculated
+        if self.statsIdle:
+            fps = traverse_time = order_update = "idle"
+        else:
+            fps = int(self.clock.get_fps())
+            traverse_time = f"{bsp_stats['traverse_time']*1000:.1f} ms"
+            order_update = f"{bsp_stats['order_update']} ({bsp_stats['rewalked_nodes']} nodes)"
             
         # Prepare debug text
         info_text = [
             f"Camera Position: {np.round(self.camera.position, 1)}",
             f"Camera Rotation: {np.round(self.camera.rotation, 1)}",
             f"FOV: {self.camera.fov:.1f}°",
-            f"FPS: {int(self.clock.get_fps())}",
+            f"FPS: {fps}",
             "",
             "BSP Statistics:",
             f"Layers Visible/Total: {bsp_layers}/{total_bsp_layers}",
+            f"Partition Strategy: {self.painter_bsp.strategy} (P)",
             f"Tree Depth: {bsp_stats['tree_depth']}",
+            f"Nodes/Splits: {bsp_stats['node_count']}/{bsp_stats['split_count']}",
             f"Total Faces: {bsp_stats['total_faces']}",
             f"Rendered Faces: {len(self.screenFaces)}",
             f"Build Time: {bsp_stats['build_time']*1000:.1f} ms",
-            f"Traverse Time: {bsp_stats['traverse_time']*1000:.1f} ms",
+            f"Build Cache Hits/Misses: {bsp_stats['cache_hits']}/{bsp_stats['cache_misses']}",
+            f"Traverse Time: {traverse_time}",
+            f"Frustum Culling: {'on' if self.frustumCulling else 'off'} (F), {bsp_stats['culled_faces']} culled",
+            f"Back-face Culling: {'on' if self.backFaceCulling else 'off'} (B), {bsp_stats['back_faces']} culled",
+            f"Order Update: {order_update}",
             f"Color Scheme: {self.color_scheme.capitalize()}",
             f"Distance Range: {dist_range}",
             f"Show Layer Numbers: {self.showLayerNumbers} (F2)",
@@ -433,14 +502,14 @@ class PainterRenderer:
             "WASD: Move | Arrows: Rotate | +/-: Zoom",
             "Mouse: Look | Space: Stabilize | F1: Debug",
             "F2: Toggle Layer Numbers | C: Cycle Color",
+            "P: Cycle Partition Strategy",
             "ESC: Exit"
         ])
         
         # Draw text
         y_offset = 10
         for line in info_text:
-            text_surface = self.font.render(line, True, (255, 255, 255))
-            self.screen.blit(text_surface, (10, y_offset))
+            self.text.draw(self.screen, line, (255, 255, 255), (10, y_offset))
             y_offset += 20
             
         # Draw BSP color legend
@@ -463,18 +532,15 @@ class PainterRenderer:
                          legend_width + 10, legend_height + 30))
         
         # Draw legend title
-        title_surface = self.font.render(f"BSP Layers ({self.color_scheme}):", True, (255, 255, 255))
-        self.screen.blit(title_surface, (x_start, y_start))
+        self.text.draw(self.screen, f"BSP Layers ({self.color_scheme}):", (255, 255, 255), (x_start, y_start))
         y_start += 20
         
         # Draw the color gradient
         steps = min(legend_width, self.max_bsp_layers)
         segment_width = legend_width / steps
         
-        for i in range(steps):
-            # Get color for this segment
-            color = self.get_color_for_bsp_layer(i, steps)
-            
+        colors = self.get_colors_for_bsp_layers(np.arange(steps), steps).tolist()
+        for i, color in enumerate(colors):
             # Draw a segment of the legend
             x_pos = int(x_start + i * segment_width)
             width = int(segment_width) + 1  # +1 to avoid gaps
@@ -484,10 +550,8 @@ class PainterRenderer:
         # Draw labels
         pygame.draw.rect(self.screen, (255, 255, 255), 
                         (x_start, y_start, legend_width, legend_height), 1)
-        back_text = self.font.render("Back", True, (255, 255, 255))
-        front_text = self.font.render("Front", True, (255, 255, 255))
-        self.screen.blit(back_text, (x_start, y_start + legend_height + 5))
-        self.screen.blit(front_text, (x_start + legend_width - 40, y_start + legend_height + 5))
+        self.text.draw(self.screen, "Back", (255, 255, 255), (x_start, y_start + legend_height + 5))
+        self.text.draw(self.screen, "Front", (255, 255, 255), (x_start + legend_width - 40, y_start + legend_height + 5))
 
     def drawBSPLayerVisualization(self, depth_info, total_layers):
         """Draw a visualization of BSP layers showing ordering and distances"""
@@ -503,8 +567,7 @@ class PainterRenderer:
                         viz_width + 10, viz_height + 30))
         
         # Draw title
-        title_surface = self.font.render("BSP Layer Visualization", True, (255, 255, 255))
-        self.screen.blit(title_surface, (x_start, y_start - 20))
+        self.text.draw(self.screen, "BSP Layer Visualization", (255, 255, 255), (x_start, y_start - 20))
         
         # Calculate min/max distances for scaling
         all_distances = []
@@ -543,15 +606,11 @@ class PainterRenderer:
                        (x_start, y_start + viz_height), 1)  # Y-axis
         
         # Draw labels
-        near_label = self.font.render(f"{min_dist:.1f}", True, (200, 200, 200))
-        far_label = self.font.render(f"{max_dist:.1f}", True, (200, 200, 200))
-        distance_label = self.font.render("Distance", True, (200, 200, 200))
-        layer_label = self.font.render("Layer", True, (200, 200, 200))
-        
-        self.screen.blit(near_label, (x_start - 5, y_start + viz_height + 5))
-        self.screen.blit(far_label, (x_start + viz_width - 20, y_start + viz_height + 5))
-        self.screen.blit(distance_label, (x_start + viz_width // 2 - 25, y_start + viz_height + 5))
-        self.screen.blit(layer_label, (x_start - 40, y_start + viz_height // 2 - 10))
+        label_color = (200, 200, 200)
+        self.text.draw(self.screen, f"{min_dist:.1f}", label_color, (x_start - 5, y_start + viz_height + 5))
+        self.text.draw(self.screen, f"{max_dist:.1f}", label_color, (x_start + viz_width - 20, y_start + viz_height + 5))
+        self.text.draw(self.screen, "Distance", label_color, (x_start + viz_width // 2 - 25, y_start + viz_height + 5))
+        self.text.draw(self.screen, "Layer", label_color, (x_start - 40, y_start + viz_height // 2 - 10))
 
     def handleCameraControls(self):
         """Handle continuous camera movement and rotation"""
@@ -724,7 +783,7 @@ class PainterRenderer:
         return False
 
     def handleEvents(self):
-        """Process all input events"""
+        """Process all input events; run() picks up what they changed through the frame and draw states"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.isRunning = False
@@ -735,11 +794,9 @@ class PainterRenderer:
                 # R key resets camera
                 elif event.key == pygame.K_r:
                     self.camera.reset()
-                    return True
                 # Space key stabilizes camera (snaps to nearest 90 degrees)
                 elif event.key == pygame.K_SPACE:
                     self.camera.stabilize()
-                    return True
                 # F1 key toggles debug info
                 elif event.key == pygame.K_F1:
                     self.showDebugInfo = not self.showDebugInfo
@@ -749,16 +806,24 @@ class PainterRenderer:
                 # C key cycles through color schemes
                 elif event.key == pygame.K_c:
                     self.cycleColorScheme()
-                    return True
+                # P key cycles through BSP partition strategies
+                elif event.key == pygame.K_p:
+                    self.cyclePartitionStrategy()
+                # F key toggles frustum culling of BSP subtrees
+                elif event.key == pygame.K_f:
+                    self.frustumCulling = not self.frustumCulling
+                # B key toggles back-face culling
+                elif event.key == pygame.K_b:
+                    self.backFaceCulling = not self.backFaceCulling
+            # The window needs the current frame presented again
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                self.redrawRequested = True
             # Mouse wheel for zoom
             elif event.type == pygame.MOUSEWHEEL:
                 # Change FOV based on scroll direction
                 self.camera.fov -= event.y * self.zoomSpeed
                 # Clamp FOV to reasonable range
                 self.camera.fov = np.clip(self.camera.fov, self.minFOV, self.maxFOV)
-                return True
-                
-        return False
     
     def cycleColorScheme(self):
         """Cycle through available color schemes"""
@@ -766,38 +831,97 @@ class PainterRenderer:
         next_index = (current_index + 1) % len(self.color_schemes)
         self.color_scheme = self.color_schemes[next_index]
 
+    def getFrustumPlanes(self) -> np.ndarray:
+        """
+        World-space planes for culling faces in front of this renderer's camera
+        
+        The painter renderer looks down +Z, where the projection gives w < 0.
+        Negating the matrix keeps every NDC coordinate and makes w positive,
+        so the usual plane extraction applies. Only the side planes and the
+        near plane are used: depth is mirrored in this convention (the far
+        plane would reject everything), and faces past the far plane are
+        still drawn.
+        """
+        return getFrustumPlanes(-self.camera.getViewProjectionMatrix())[:5]
+
+    def cyclePartitionStrategy(self):
+        """Cycle through BSP partition strategies (rebuilds the tree)"""
+        current_index = PARTITION_STRATEGIES.index(self.painter_bsp.strategy)
+        next_index = (current_index + 1) % len(PARTITION_STRATEGIES)
+        self.painter_bsp.set_strategy(PARTITION_STRATEGIES[next_index])
+
+    def getFrameState(self) -> tuple:
+        """Everything the calculated faces depend on: camera (view and FOV), scene geometry, culling, colors and BSP strategy"""
+        return (self.camera.version, self.scene.version, self.frustumCulling, self.backFaceCulling,
+                self.color_scheme, self.painter_bsp.strategy)
+
+    def getDrawState(self) -> tuple:
+        """Everything the drawn frame depends on: the calculated faces and the overlay toggles"""
+        return (self.getFrameState(), self.showDebugInfo, self.showLayerNumbers)
+
+    def waitForEvent(self):
+        """Sleep until the next event arrives and put it back for handleEvents"""
+        pygame.event.post(pygame.event.wait())
+        # The time spent waiting is not frame time; a new clock keeps movement from jumping
+        self.clock = pygame.time.Clock()
+
     def run(self):
-        """Main render loop"""
+        """
+        Main render loop, rendering on demand
+        
+        The scene (BSP order, projection and colors) is recalculated only when
+        the frame state changed, and the frame is redrawn only when that or an
+        overlay toggle changed (or the window asks for a redraw). After a tick
+        without changes the loop sleeps until the next event, so an idle
+        window uses next to no CPU; held movement keys change the camera every
+        tick and keep it running. Before sleeping, an overlay still showing
+        the frame rate and timings of a calculated frame is redrawn with them
+        marked idle.
+        """
+        calculated_state = self.getFrameState()  # The constructor already calculated the scene
+        drawn_state = None
+        changed = True
+        live_stats_drawn = False
         while self.isRunning:
-            # Handle input events
-            camera_changed = self.handleEvents()
-            
-            # Handle continuous camera controls
-            if self.handleCameraControls():
-                camera_changed = True
+            if not changed:
+                if live_stats_drawn:
+                    # Nothing is measured while the loop sleeps
+                    if self.showDebugInfo:
+                        self.drawScene()
+                    pygame.display.set_caption("3D Renderer with Painter's Algorithm & BSP - FPS: idle")
+                    live_stats_drawn = False
+                self.waitForEvent()
             
-            # Handle arrow key camera rotation
-            if self.handleArrowsAsCameraControls():
-                camera_changed = True
-            
-            # Handle keyboard zoom controls
-            if self.handleKeyboardZoom():
-                camera_changed = True
-            
-            # Handle mouse looking
-            if self.handleMouseLook():
-                camera_changed = True
-            
-            # Always recalculate scene - this ensures BSP colors update with camera movement
-            self.calculateScene()
-            
-            # Draw current scene state
-            self.drawScene()
+            # Handle input events
+            self.handleEvents()
+            
+            # Handle continuous camera controls, arrow key rotation, keyboard zoom and mouse looking
+            self.handleCameraControls()
+            self.handleArrowsAsCameraControls()
+            self.handleKeyboardZoom()
+            self.handleMouseLook()
+            
+            # Recalculate only what the camera and settings invalidated
+            frame_state = self.getFrameState()
+            self.statsIdle = frame_state == calculated_state
+            if not self.statsIdle:
+                self.calculateScene()
+                calculated_state = frame_state
+            
+            # Draw current scene state when it differs from what is on screen
+            draw_state = self.getDrawState()
+            changed = draw_state != drawn_state or self.redrawRequested
+            if changed:
+                self.drawScene()
+                drawn_state = draw_state
+                self.redrawRequested = False
+                live_stats_drawn = not self.statsIdle
             
             # Cap the frame rate
             self.clock.tick(60)
             
             # Update window title with FPS
-            pygame.display.set_caption(f"3D Renderer with Painter's Algorithm & BSP - FPS: {int(self.clock.get_fps())}")
+            if changed and not self.statsIdle:
+                pygame.display.set_caption(f"3D Renderer with Painter's Algorithm & BSP - FPS: {int(self.clock.get_fps())}")
         
         pygame.quit() 
\ No newline at end of file
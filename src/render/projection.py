@@ -1,6 +1,5 @@
 from camera.camera import Camera
 from scene.scene import Scene
-from scene.Cuboid import Cuboid
 import numpy as np
 
 class Projection:
@@ -8,39 +7,34 @@ class Projection:
     self.camera = camera
     self.scene = scene
 
+    # Persistent clip-space output, reused across frames
+    self.clipVertices = np.empty((0, 4))
+
   def projectCameraObjects(self):
-    self.objects = []
-    projectionMatrix = self.getProjectionMatrix()
-    viewMatrix = self.getViewMatrix()
+    """Project the whole scene to clip space in one pass over the packed vertex buffer
+
+    Results are written in place into `clipVertices`, which is only
+    reallocated when the scene's vertex count changes.
+    """
+    buffers = self.scene.getBuffers()
+    if len(self.clipVertices) != buffers.vertexCount:
+      self.clipVertices = np.empty((buffers.vertexCount, 4))
 
-    for obj in self.scene.getObjects():
-      # Create a deep copy and apply transformations
-      objCopy = obj.makeCopy()
-      objCopy.transformVertices(projectionMatrix @ viewMatrix)
-      self.objects.append(objCopy)
+    # Instances are projected straight from their shared base mesh with one
+    # stacked (projection @ view @ model) product per mesh
+    buffers.transformInstances(self.getViewProjectionMatrix(), self.clipVertices)
 
   def getProjectionMatrix(self) -> np.ndarray:
-    """Creates a perspective projection matrix"""
-    fovRad = np.radians(self.camera.fov)
-    f = 1.0 / np.tan(fovRad / 2)
-    aspect = self.camera.aspectRatio
-    near = self.camera.near
-    far = self.camera.far
-    
-    # Calculate projection matrix components for better depth handling
-    a = -(far + near) / (far - near)
-    b = -(2 * far * near) / (far - near)
-    
-    return np.array([
-        [f / aspect, 0, 0, 0],
-        [0, f, 0, 0],
-        [0, 0, a, b],
-        [0, 0, -1, 0]
-    ])
+    """Perspective projection matrix, cached by the camera"""
+    return self.camera.getProjectionMatrix()
 
   def getViewMatrix(self) -> np.ndarray:
     return self.camera.CameraMatrix
 
-  def getObjects(self):
-    return self.objects
+  def getViewProjectionMatrix(self) -> np.ndarray:
+    """Combined projection @ view matrix, cached by the camera"""
+    return self.camera.getViewProjectionMatrix()
+
+  def getClipVertices(self) -> np.ndarray:
+    return self.clipVertices
   
\ No newline at end of file
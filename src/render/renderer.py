@@ -2,6 +2,7 @@ from camera.camera import Camera
 from scene.scene import Scene
 from scene.Cuboid import Cuboid
 from render.projection import Projection
+from render.clipping import clipEdges
 import pygame
 import numpy as np
 
@@ -54,25 +55,60 @@ class Renderer:
     self.minFOV = 30.0   # Maximum zoom in
     self.maxFOV = 120.0  # Maximum zoom out
 
+    # Clip edges against the whole frustum instead of the near plane only
+    self.clipToFrustum = False
+
+    # Set by window events that need the current frame presented again
+    self.redrawRequested = False
+
+    # Viewport stage output, reused across frames
+    self.screenVertices = np.empty((0, 2), dtype=np.int64)
+    self.ndcVertices = np.empty((0, 2))
+
     # Initial scene calculation
     self.calculateScene()
 
   def calculateScene(self):
     """Calculate all scene transformations and projections"""
     self.projection.projectCameraObjects()
-    self.screenObjects = self.mapObjectToScreen(self.projection.getObjects())
+
+    # Clip every edge of the scene in clip space, so partially visible objects
+    # keep the part of their edges that is in front of the near plane
+    buffers = self.scene.getBuffers()
+    clipVertices = self.projection.getClipVertices()
+    starts, ends, visible, clipped = clipEdges(clipVertices, buffers.edges, self.clipToFrustum)
+
+    # Strips whose edges are all visible and uncut are drawn as one polyline each
+    intact = visible & ~clipped
+    intactStrips = np.zeros(len(buffers.stripSizes), dtype=bool)
+    if len(intactStrips):
+      intactStrips = np.logical_and.reduceat(intact[buffers.stripEdges], buffers.stripEdgeOffsets)
+    inIntactStrip = np.zeros(len(buffers.edges), dtype=bool)
+    inIntactStrip[buffers.stripEdges[np.repeat(intactStrips, buffers.stripSizes - 1)]] = True
+
+    # Every other visible edge is drawn on its own, from its clipped endpoints
+    loose = visible & ~inIntactStrip
+
+    # Map scene vertices and loose endpoints (all with w > 0 where used) to the screen in one pass
+    points = np.concatenate((clipVertices, starts[loose], ends[loose]))
+    screenPoints, _ = self.mapVerticesToScreen(points)
+    vertexCount = len(clipVertices)
+    self.screenEdges = screenPoints[vertexCount:].reshape(2, -1, 2).transpose(1, 0, 2)
+
+    stripPoints = screenPoints[buffers.strips[np.repeat(intactStrips, buffers.stripSizes)]].tolist()
+    stripBounds = np.concatenate(([0], np.cumsum(buffers.stripSizes[intactStrips]))).tolist()
+    self.screenStrips = [stripPoints[start:stop] for start, stop in zip(stripBounds[:-1], stripBounds[1:])]
 
   def drawScene(self):
     """Draw the pre-calculated scene"""
     # Clear screen with black background
     self.screen.fill((0, 0, 0))
     
-    # Draw all objects using pre-calculated screen coordinates
-    for screenObject in self.screenObjects:
-        for edge in self.scene.defualtEdgesInCuboid:
-            start_pos = screenObject[edge[0]]
-            end_pos = screenObject[edge[1]]
-            pygame.draw.line(self.screen, (255, 255, 255), start_pos, end_pos, 1)
+    # Draw whole strips of connected edges with one call each, then the loose edges
+    for points in self.screenStrips:
+        pygame.draw.lines(self.screen, (255, 255, 255), False, points, 1)
+    for start_pos, end_pos in self.screenEdges.tolist():
+        pygame.draw.line(self.screen, (255, 255, 255), start_pos, end_pos, 1)
     
     # Update the display
     pygame.display.flip()
@@ -217,8 +253,7 @@ class Renderer:
     return False
 
   def handleEvents(self):
-    needsRecalculation = False
-    
+    """Process input events and continuous controls; run() picks up what they changed through the frame state"""
     for event in pygame.event.get():
       if event.type == pygame.QUIT:
         self.isRunning = False
@@ -227,84 +262,101 @@ class Renderer:
           self.isRunning = False
         elif event.key == pygame.K_r:
           self.camera.reset()
-          needsRecalculation = True
         elif event.key == pygame.K_e:
           self.camera.stabilize()
-          needsRecalculation = True
+        elif event.key == pygame.K_f:
+          # Toggle clipping against the whole frustum
+          self.clipToFrustum = not self.clipToFrustum
         elif event.key == pygame.K_PLUS or event.key == pygame.K_EQUALS:
           # Zoom in (decrease FOV)
           newFOV = self.camera.fov - self.zoomSpeed
           self.camera.fov = np.clip(newFOV, self.minFOV, self.maxFOV)
-          needsRecalculation = True
         elif event.key == pygame.K_MINUS:
           # Zoom out (increase FOV)
           newFOV = self.camera.fov + self.zoomSpeed
           self.camera.fov = np.clip(newFOV, self.minFOV, self.maxFOV)
-          needsRecalculation = True
       elif event.type == pygame.MOUSEWHEEL:
         # Scroll up (positive y) = zoom in (decrease FOV)
         # Scroll down (negative y) = zoom out (increase FOV)
         newFOV = self.camera.fov - event.y * self.zoomSpeed
         # Clamp FOV between min and max values
         self.camera.fov = np.clip(newFOV, self.minFOV, self.maxFOV)
-        needsRecalculation = True
+      elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+        self.redrawRequested = True
     
     # Handle continuous camera movement
-    if self.handleCameraControls():
-        needsRecalculation = True
+    self.handleCameraControls()
     
     # Handle mouse looking
-    if self.handleMouseLook():
-        needsRecalculation = True
+    self.handleMouseLook()
         
     # Handle arrow key rotation
-    if self.handleArrowsAsCameraControls():
-        needsRecalculation = True
-    
-    if needsRecalculation:
-        self.calculateScene()
+    self.handleArrowsAsCameraControls()
 
-  def calculateScreenPosition(self, vertex: tuple[float, float, float, float]):
-    """Convert vertex from clip space to screen space. Returns None if vertex is behind camera."""
-    # Check if vertex is behind camera (w should be positive for vertices in front of camera)
-    if vertex[3] <= 0:
-        return None
-        
-    # Perform perspective division
-    x = vertex[0] / vertex[3]
-    y = vertex[1] / vertex[3]
-    
-    # Convert to screen coordinates
-    x = int(self.camera.width/2 + x * self.camera.width/2)
-    y = int(self.camera.height/2 - y * self.camera.height/2)
-    
-    return (x, y)
+  def mapVerticesToScreen(self, clipVertices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Convert all clip-space vertices to screen space at once
 
-  def mapObjectToScreen(self, projectedObjects: list[Cuboid]):
-    mappedObjects = []
-    for object in projectedObjects:
-        # Map all vertices of the object
-        mappedObject = []
-        isObjectVisible = True
-        
-        # Check if any vertex is behind camera
-        for vertex in object.vertices:
-            screenPos = self.calculateScreenPosition(vertex)
-            if screenPos is None:
-                isObjectVisible = False
-                break
-            mappedObject.append(screenPos)
-            
-        # Only add object if all vertices are visible
-        if isObjectVisible:
-            mappedObjects.append(mappedObject)
-            
-    return mappedObjects
+    Returns an (N, 2) integer array of screen coordinates and an (N,) mask
+    that is False for vertices behind the camera (w <= 0); screen coordinates
+    of those vertices are meaningless.
+    """
+    count = len(clipVertices)
+    if len(self.screenVertices) < count:
+      # Grow only, so frames with a varying number of points reuse the same buffers
+      self.screenVertices = np.empty((count, 2), dtype=np.int64)
+      self.ndcVertices = np.empty((count, 2))
+    screenVertices = self.screenVertices[:count]
+    ndcVertices = self.ndcVertices[:count]
+
+    # Check which vertices are behind camera (w should be positive for vertices in front of camera)
+    w = clipVertices[:, 3]
+    visible = w > 0
+
+    # Perform perspective division (vertices behind the camera are divided by 1 and ignored)
+    np.divide(clipVertices[:, :2], np.where(visible, w, 1.0)[:, None], out=ndcVertices)
+
+    # Convert to screen coordinates, truncating like int()
+    halfWidth = self.camera.width / 2
+    halfHeight = self.camera.height / 2
+    ndcVertices *= (halfWidth, -halfHeight)
+    ndcVertices += (halfWidth, halfHeight)
+    np.copyto(screenVertices, ndcVertices, casting='unsafe')
+
+    return screenVertices, visible
+
+  def getFrameState(self) -> tuple:
+    """Everything the calculated frame depends on: camera (view and FOV), scene geometry and clipping mode"""
+    return (self.camera.version, self.scene.version, self.clipToFrustum)
+
+  def waitForEvent(self):
+    """Sleep until the next event arrives and put it back for handleEvents"""
+    pygame.event.post(pygame.event.wait())
+    # The time spent waiting is not frame time; a new clock keeps movement from jumping
+    self.clock = pygame.time.Clock()
 
   def run(self):
+    """Main loop, rendering on demand
+
+    The scene is recalculated and redrawn only when the frame state changed
+    (or the window asks for a redraw). After a tick without changes the loop
+    sleeps until the next event, so an idle window uses next to no CPU.
+    Held movement keys change the camera every tick and keep it running.
+    """
+    drawnState = None
+    changed = True
     while self.isRunning:
+      if not changed:
+        self.waitForEvent()
       self.handleEvents()
-      self.drawScene()
+
+      frameState = self.getFrameState()
+      changed = frameState != drawnState or self.redrawRequested
+      if frameState != drawnState:
+        self.calculateScene()
+      if changed:
+        self.drawScene()
+        drawnState = frameState
+        self.redrawRequested = False
       self.clock.tick(60)  # Limit to 60 FPS
     
     # Clean up
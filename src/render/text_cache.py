@@ -0,0 +1,119 @@
+import re
+import pygame
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+Color = Tuple[int, int, int]
+
+# Characters drawn one by one from a glyph atlas instead of as part of a string
+ATLAS_GLYPHS = "0123456789.-"
+_NUMBER_RUNS = re.compile(f"([{re.escape(ATLAS_GLYPHS)}]+)")
+
+class TextCache:
+    """
+    Draws text of one font from cached surfaces
+
+    Surfaces of drawn strings are kept per (string, color) and evicted least
+    recently used first, so unchanged text is only blitted. Missing strings
+    with numbers in them are not rendered by the font but assembled: the
+    numbers from a per-color atlas of digits, '.' and '-', the text between
+    them from cached surfaces, which stay reusable while the numbers change.
+    """
+
+    def __init__(self, font: pygame.font.Font, capacity: int = 512, atlas_capacity: int = 64):
+        """
+        Args:
+            font: Font to render with
+            capacity: Number of string surfaces kept
+            atlas_capacity: Number of glyph atlases (one per color) kept
+        """
+        self.font = font
+        self.capacity = capacity
+        self.atlas_capacity = atlas_capacity
+        self._surfaces: OrderedDict = OrderedDict()
+        self._atlases: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text: str, color: Color) -> pygame.Surface:
+        """Surface of a string, created only when it is not cached"""
+        key = (text, tuple(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        if _NUMBER_RUNS.search(text):
+            surface = self._assemble(text, key[1])
+        else:
+            surface = self.font.render(text, True, key[1])
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.capacity:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def atlas(self, color: Color) -> Dict[str, pygame.Surface]:
+        """Surfaces of the ATLAS_GLYPHS characters in one color"""
+        key = tuple(color)
+        glyphs = self._atlases.get(key)
+        if glyphs is not None:
+            self._atlases.move_to_end(key)
+            return glyphs
+
+        glyphs = {glyph: self.font.render(glyph, True, key) for glyph in ATLAS_GLYPHS}
+        self._atlases[key] = glyphs
+        if len(self._atlases) > self.atlas_capacity:
+            self._atlases.popitem(last=False)
+        return glyphs
+
+    def _assemble(self, text: str, color: Color) -> pygame.Surface:
+        """Build the surface of a string containing numbers from cached runs and atlas glyphs"""
+        # Splitting on a capturing group alternates text and number runs
+        runs = _NUMBER_RUNS.split(text)
+        if len(runs) == 1:
+            # Nothing in it comes from the atlas
+            return self.font.render(text, True, color)
+        
+        glyphs = self.atlas(color)
+        pieces = []
+        for i, run in enumerate(runs):
+            if i % 2:
+                pieces.extend(glyphs[char] for char in run)
+            elif run:
+                pieces.append(self.render(run, color))
+
+        width = sum(piece.get_width() for piece in pieces)
+        height = max(piece.get_height() for piece in pieces)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        # Transparent pixels in the text color, so blending keeps antialiased edges from darkening
+        surface.fill((*color, 0))
+        x = 0
+        for piece in pieces:
+            surface.blit(piece, (x, 0))
+            x += piece.get_width()
+        return surface
+
+    def draw(self, target: pygame.Surface, text: str, color: Color, position: Tuple[float, float],
+             center: bool = False) -> pygame.Rect:
+        """
+        Draw text onto a surface
+
+        Args:
+            target: Surface to draw on
+            text: Text to draw
+            color: RGB text color
+            position: Top-left corner of the text, or its center when `center` is set
+
+        Returns:
+            The area covered by the text
+        """
+        surface = self.render(text, color)
+        rect = surface.get_rect()
+        if center:
+            rect.center = (int(position[0]), int(position[1]))
+        else:
+            rect.topleft = (int(position[0]), int(position[1]))
+        target.blit(surface, rect)
+        return rect
@@ -1,4 +1,5 @@
 import numpy as np
+import transformation
 
 class Cuboid():
   def __init__ (self, sizes: tuple[float, float, float], centerPosition: tuple[float, float, float]):
@@ -24,12 +25,38 @@ class Cuboid():
   
 
   def transformVertices(self, matrix: list[float]):
-    for vertex in range(len(self.vertices)):
-      self.vertices[vertex] = self.transformVertex(self.vertices[vertex], matrix)
+    self.vertices = transformation.transformVertices(self.vertices, matrix)
 
   def transformVertex(self, vertex: tuple[float, float, float, float], matrix: list[float]):
     return matrix @ vertex
 
+  def getMeshKey(self) -> tuple:
+    """Key identifying the geometry, shared by every cuboid with the same parameters"""
+    return ("Cuboid", tuple(self.sizes), tuple(self.centerPosition))
+
+  def getTopologyKey(self) -> tuple:
+    """Key identifying the face/edge layout, shared by every cuboid"""
+    return ("Cuboid",)
+
+  def getFaces(self):
+    """Returns the vertex indices of each face (front, back, left, right, top, bottom)"""
+    return [
+        [0, 1, 3, 2],
+        [4, 6, 7, 5],
+        [0, 2, 6, 4],
+        [1, 5, 7, 3],
+        [2, 3, 7, 6],
+        [0, 4, 5, 1]
+    ]
+
+  def getEdges(self):
+    """Returns the vertex index pairs of the wireframe edges"""
+    return [
+        (0, 1), (1, 3), (3, 2), (2, 0),
+        (4, 5), (5, 7), (7, 6), (6, 4),
+        (0, 4), (1, 5), (2, 6), (3, 7)
+    ]
+
   def makeCopy(self):
     """Create a deep copy of the object"""
     copy = Cuboid(self.sizes, self.centerPosition)
@@ -1,4 +1,5 @@
 import numpy as np
+import transformation
 
 class Cylinder():
     def __init__(self, radius: float, height: float, segments: int, centerPosition: tuple[float, float, float]):
@@ -37,12 +38,53 @@ class Cylinder():
         return np.array(vertices)
     
     def transformVertices(self, matrix: list[float]):
-        for vertex in range(len(self.vertices)):
-            self.vertices[vertex] = self.transformVertex(self.vertices[vertex], matrix)
+        self.vertices = transformation.transformVertices(self.vertices, matrix)
 
     def transformVertex(self, vertex: tuple[float, float, float, float], matrix: list[float]):
         return matrix @ vertex
 
+    def getMeshKey(self) -> tuple:
+        """Key identifying the geometry, shared by every cylinder with the same parameters"""
+        return ("Cylinder", self.radius, self.height, self.segments, tuple(self.centerPosition))
+
+    def getTopologyKey(self) -> tuple:
+        """Key identifying the face/edge layout, shared by cylinders with the same segment count"""
+        return ("Cylinder", self.segments)
+
+    def getFaces(self):
+        """
+        Returns the vertex indices of each face: the side rectangles first,
+        then the bottom cap triangles, then the top cap triangles.
+        """
+        faces = []
+        segments = self.segments
+        bottom_center_idx = 2 * segments
+        top_center_idx = 2 * segments + 1
+
+        # Side faces (rectangles)
+        for i in range(segments):
+            faces.append([i * 2, (i * 2 + 2) % (segments * 2), (i * 2 + 3) % (segments * 2), i * 2 + 1])
+
+        # Bottom cap (triangles)
+        for i in range(segments):
+            faces.append([i * 2, (i * 2 + 2) % (segments * 2), bottom_center_idx])
+
+        # Top cap (triangles)
+        for i in range(segments):
+            faces.append([i * 2 + 1, (i * 2 + 3) % (segments * 2), top_center_idx])
+
+        return faces
+
+    def getEdges(self):
+        """Returns the vertex index pairs of the wireframe edges (both rings and the verticals)"""
+        edges = []
+        segments = self.segments
+        for i in range(segments):
+            edges.append((i * 2, (i * 2 + 2) % (segments * 2)))          # Bottom ring
+            edges.append((i * 2 + 1, (i * 2 + 3) % (segments * 2)))      # Top ring
+            edges.append((i * 2, i * 2 + 1))                             # Vertical
+        return edges
+
     def makeCopy(self):
         """Create a deep copy of the object"""
         copy = Cylinder(self.radius, self.height, self.segments, self.centerPosition)
@@ -1,4 +1,5 @@
 import numpy as np
+import transformation
 
 class Octahedron():
     def __init__(self, size: float, centerPosition: tuple[float, float, float]):
@@ -21,12 +22,40 @@ class Octahedron():
         ])
     
     def transformVertices(self, matrix: list[float]):
-        for vertex in range(len(self.vertices)):
-            self.vertices[vertex] = self.transformVertex(self.vertices[vertex], matrix)
+        self.vertices = transformation.transformVertices(self.vertices, matrix)
 
     def transformVertex(self, vertex: tuple[float, float, float, float], matrix: list[float]):
         return matrix @ vertex
 
+    def getMeshKey(self) -> tuple:
+        """Key identifying the geometry, shared by every octahedron with the same parameters"""
+        return ("Octahedron", self.size, tuple(self.centerPosition))
+
+    def getTopologyKey(self) -> tuple:
+        """Key identifying the face/edge layout, shared by every octahedron"""
+        return ("Octahedron",)
+
+    def getFaces(self):
+        """Returns the vertex indices of the 8 triangular faces"""
+        return [
+            [0, 2, 4],  # Top-Right-Front
+            [0, 4, 3],  # Top-Front-Left
+            [0, 3, 5],  # Top-Left-Back
+            [0, 5, 2],  # Top-Back-Right
+            [1, 2, 4],  # Bottom-Right-Front
+            [1, 4, 3],  # Bottom-Front-Left
+            [1, 3, 5],  # Bottom-Left-Back
+            [1, 5, 2]   # Bottom-Back-Right
+        ]
+
+    def getEdges(self):
+        """Returns the vertex index pairs of the wireframe edges"""
+        return [
+            (0, 2), (0, 3), (0, 4), (0, 5),  # Top to the equator
+            (1, 2), (1, 3), (1, 4), (1, 5),  # Bottom to the equator
+            (2, 4), (4, 3), (3, 5), (5, 2)   # Equator
+        ]
+
     def makeCopy(self):
         """Create a deep copy of the object"""
         copy = Octahedron(self.size, self.centerPosition)
@@ -1,5 +1,6 @@
 import numpy as np
 import math
+import transformation
 
 class Pyramid:
     def __init__(self, base_width, height, position):
@@ -25,8 +26,7 @@ class Pyramid:
         ])
     
     def transformVertices(self, matrix):
-        for vertex in range(len(self.vertices)):
-            self.vertices[vertex] = matrix @ self.vertices[vertex]
+        self.vertices = transformation.transformVertices(self.vertices, matrix)
             
     def makeCopy(self):
         """Create a deep copy of the object"""
@@ -61,8 +61,7 @@ class Prism:
         ])
         
     def transformVertices(self, matrix):
-        for vertex in range(len(self.vertices)):
-            self.vertices[vertex] = matrix @ self.vertices[vertex]
+        self.vertices = transformation.transformVertices(self.vertices, matrix)
             
     def makeCopy(self):
         """Create a deep copy of the object"""
@@ -112,8 +111,7 @@ class Cylinder:
         return np.array(vertices)
         
     def transformVertices(self, matrix):
-        for vertex in range(len(self.vertices)):
-            self.vertices[vertex] = matrix @ self.vertices[vertex]
+        self.vertices = transformation.transformVertices(self.vertices, matrix)
             
     def makeCopy(self):
         """Create a deep copy of the object"""
@@ -176,8 +174,7 @@ class Octahedron:
         ])
         
     def transformVertices(self, matrix):
-        for vertex in range(len(self.vertices)):
-            self.vertices[vertex] = matrix @ self.vertices[vertex]
+        self.vertices = transformation.transformVertices(self.vertices, matrix)
             
     def makeCopy(self):
         """Create a deep copy of the object"""
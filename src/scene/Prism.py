@@ -1,4 +1,5 @@
 import numpy as np
+import transformation
 
 class Prism():
     def __init__(self, side_length: float, height: float, centerPosition: tuple[float, float, float]):
@@ -32,12 +33,37 @@ class Prism():
         ])
     
     def transformVertices(self, matrix: list[float]):
-        for vertex in range(len(self.vertices)):
-            self.vertices[vertex] = self.transformVertex(self.vertices[vertex], matrix)
+        self.vertices = transformation.transformVertices(self.vertices, matrix)
 
     def transformVertex(self, vertex: tuple[float, float, float, float], matrix: list[float]):
         return matrix @ vertex
 
+    def getMeshKey(self) -> tuple:
+        """Key identifying the geometry, shared by every prism with the same parameters"""
+        return ("Prism", self.side_length, self.height, tuple(self.centerPosition))
+
+    def getTopologyKey(self) -> tuple:
+        """Key identifying the face/edge layout, shared by every prism"""
+        return ("Prism",)
+
+    def getFaces(self):
+        """Returns the vertex indices of each face (2 triangular ends + 3 sides)"""
+        return [
+            [0, 1, 2],     # Bottom
+            [3, 4, 5],     # Top
+            [0, 3, 4, 1],  # Side 1
+            [1, 4, 5, 2],  # Side 2
+            [2, 5, 3, 0]   # Side 3
+        ]
+
+    def getEdges(self):
+        """Returns the vertex index pairs of the wireframe edges"""
+        return [
+            (0, 1), (1, 2), (2, 0),  # Bottom triangle
+            (3, 4), (4, 5), (5, 3),  # Top triangle
+            (0, 3), (1, 4), (2, 5)   # Vertical edges
+        ]
+
     def makeCopy(self):
         """Create a deep copy of the object"""
         copy = Prism(self.side_length, self.height, self.centerPosition)
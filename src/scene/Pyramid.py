@@ -1,4 +1,5 @@
 import numpy as np
+import transformation
 
 class Pyramid():
     def __init__(self, base_size: float, height: float, centerPosition: tuple[float, float, float]):
@@ -28,12 +29,36 @@ class Pyramid():
         ])
     
     def transformVertices(self, matrix: list[float]):
-        for vertex in range(len(self.vertices)):
-            self.vertices[vertex] = self.transformVertex(self.vertices[vertex], matrix)
+        self.vertices = transformation.transformVertices(self.vertices, matrix)
 
     def transformVertex(self, vertex: tuple[float, float, float, float], matrix: list[float]):
         return matrix @ vertex
 
+    def getMeshKey(self) -> tuple:
+        """Key identifying the geometry, shared by every pyramid with the same parameters"""
+        return ("Pyramid", self.base_size, self.height, tuple(self.centerPosition))
+
+    def getTopologyKey(self) -> tuple:
+        """Key identifying the face/edge layout, shared by every pyramid"""
+        return ("Pyramid",)
+
+    def getFaces(self):
+        """Returns the vertex indices of each face (square base + 4 triangles)"""
+        return [
+            [0, 1, 2, 3],  # Base
+            [0, 1, 4],     # Front
+            [1, 2, 4],     # Right
+            [2, 3, 4],     # Back
+            [3, 0, 4]      # Left
+        ]
+
+    def getEdges(self):
+        """Returns the vertex index pairs of the wireframe edges"""
+        return [
+            (0, 1), (1, 2), (2, 3), (3, 0),  # Base
+            (0, 4), (1, 4), (2, 4), (3, 4)   # Sides up to the apex
+        ]
+
     def makeCopy(self):
         """Create a deep copy of the object"""
         copy = Pyramid(self.base_size, self.height, self.centerPosition)
@@ -0,0 +1,155 @@
+from scene.topology import getEdgeTable, getFaceTopology
+import transformation
+import numpy as np
+
+class InstanceGroup:
+  """All instances of one base mesh, stored back to back in the packed buffers"""
+
+  def __init__(self, mesh, objectIndices: list[int], modelMatrices: np.ndarray, start: int):
+    self.mesh = mesh
+    self.objectIndices = np.array(objectIndices, dtype=np.int64)
+    self.modelMatrices = modelMatrices  # (K, 4, 4), one per instance
+    self.combinedMatrices = np.empty_like(modelMatrices)  # Scratch for matrix @ modelMatrices, reused every frame
+    self.start = start                  # First row of the group in the vertex buffer
+    self.instanceCount = len(objectIndices)
+    self.vertexCount = len(mesh.vertices)  # Vertices per instance
+
+  @property
+  def stop(self) -> int:
+    return self.start + self.instanceCount * self.vertexCount
+
+class SceneBuffers:
+  """Packed representation of all objects in a scene
+
+  Every world-space vertex lives in one contiguous (V, 4) float array.
+  Object `i` owns the rows `objectOffsets[i]:objectOffsets[i] + objectCounts[i]`.
+  Rows are laid out per instance group (all instances of one base mesh back
+  to back), so a whole group can be transformed with one stacked product
+  straight into its slice of the buffer.
+
+  Faces are stored as one flat array of global vertex indices (`faceIndices`),
+  with `faceOffsets`/`faceSizes` giving the slice of each face. The faces of
+  object `i` are contiguous, from `objectFaceOffsets[i]` on
+  (`objectFaceCounts[i]` of them); the painter's BSP tree takes its faces
+  from here. Edges are an (E, 2) array of global vertex indices.
+
+  Edges are also covered by polylines for batched drawing: `strips` holds
+  global vertex indices (slices given by `stripOffsets`/`stripSizes`) and
+  `stripEdges` the global edge index of each consecutive pair in a strip
+  (slices start at `stripEdgeOffsets`).
+  """
+
+  def __init__(self, objects: list):
+    self.objectCount = len(objects)
+    self.objects = list(objects)
+    self.objectIndices = {id(obj): index for index, obj in enumerate(self.objects)}
+    self.groups = self._groupInstances(objects)
+
+    # Vertex table
+    self.objectCounts = np.zeros(self.objectCount, dtype=np.int64)
+    self.objectOffsets = np.zeros(self.objectCount, dtype=np.int64)
+    for group in self.groups:
+      self.objectCounts[group.objectIndices] = group.vertexCount
+      self.objectOffsets[group.objectIndices] = group.start + group.vertexCount * np.arange(group.instanceCount)
+    self._vertices = None
+
+    # Face and edge index buffers: topology comes once from each base mesh
+    # and is offset for every instance of it
+    faceIndices, faceSizes = [], []
+    edges = []
+    strips, stripSizes, stripEdges = [], [], []
+    self.objectFaceCounts = np.zeros(self.objectCount, dtype=np.int64)
+    self.objectFaceOffsets = np.zeros(self.objectCount, dtype=np.int64)
+    faceStart = 0
+    edgeStart = 0
+    for group in self.groups:
+      instanceOffsets = self.objectOffsets[group.objectIndices]
+      faceTopology = getFaceTopology(group.mesh)
+      meshFaceCount = faceTopology.faceCount
+      edgeTable = getEdgeTable(group.mesh)
+      meshEdges = edgeTable.edges
+      instanceEdgeOffsets = edgeStart + len(meshEdges) * np.arange(group.instanceCount)
+
+      faceIndices.append((faceTopology.indices[None, :] + instanceOffsets[:, None]).ravel())
+      faceSizes.append(np.tile(faceTopology.sizes, group.instanceCount))
+      edges.append((meshEdges[None, :, :] + instanceOffsets[:, None, None]).reshape(-1, 2))
+      strips.append((edgeTable.strips[None, :] + instanceOffsets[:, None]).ravel())
+      stripSizes.append(np.tile(edgeTable.stripSizes, group.instanceCount))
+      stripEdges.append((edgeTable.stripEdges[None, :] + instanceEdgeOffsets[:, None]).ravel())
+
+      self.objectFaceCounts[group.objectIndices] = meshFaceCount
+      self.objectFaceOffsets[group.objectIndices] = faceStart + meshFaceCount * np.arange(group.instanceCount)
+      faceStart += meshFaceCount * group.instanceCount
+      edgeStart += len(meshEdges) * group.instanceCount
+
+    self.faceIndices = np.concatenate(faceIndices) if faceIndices else np.empty(0, dtype=np.int64)
+    self.faceSizes = np.concatenate(faceSizes) if faceSizes else np.empty(0, dtype=np.int64)
+    self.faceOffsets = self._offsetsFromCounts(self.faceSizes)
+    self.edges = np.concatenate(edges) if edges else np.empty((0, 2), dtype=np.int64)
+    self.strips = np.concatenate(strips) if strips else np.empty(0, dtype=np.int64)
+    self.stripSizes = np.concatenate(stripSizes) if stripSizes else np.empty(0, dtype=np.int64)
+    self.stripOffsets = self._offsetsFromCounts(self.stripSizes)
+    self.stripEdges = np.concatenate(stripEdges) if stripEdges else np.empty(0, dtype=np.int64)
+    self.stripEdgeOffsets = self.stripOffsets - np.arange(len(self.stripSizes))
+
+  @staticmethod
+  def _groupInstances(objects: list) -> list[InstanceGroup]:
+    """Group objects by base mesh, keeping the order in which meshes first appear"""
+    byMesh = {}
+    for index, obj in enumerate(objects):
+      byMesh.setdefault(id(obj.mesh), (obj.mesh, []))[1].append(index)
+
+    groups = []
+    start = 0
+    for mesh, indices in byMesh.values():
+      modelMatrices = np.stack([objects[index].modelMatrix for index in indices]).astype(np.float64)
+      group = InstanceGroup(mesh, indices, modelMatrices, start)
+      groups.append(group)
+      start = group.stop
+    return groups
+
+  @staticmethod
+  def _offsetsFromCounts(counts: np.ndarray) -> np.ndarray:
+    """Exclusive prefix sum: where each block starts in the packed array"""
+    offsets = np.zeros(len(counts), dtype=np.int64)
+    if len(counts) > 1:
+      np.cumsum(counts[:-1], out=offsets[1:])
+    return offsets
+
+  def findObjects(self, objects: list) -> np.ndarray | None:
+    """Indices of objects in these buffers, or None when one of them was not packed here"""
+    indices = np.empty(len(objects), dtype=np.int64)
+    for k, obj in enumerate(objects):
+      index = self.objectIndices.get(id(obj))
+      if index is None or self.objects[index] is not obj:
+        return None
+      indices[k] = index
+    return indices
+
+  @property
+  def vertexCount(self) -> int:
+    return self.groups[-1].stop if self.groups else 0
+
+  @property
+  def vertices(self) -> np.ndarray:
+    """World-space vertices of all objects, computed on first use"""
+    if self._vertices is None:
+      self._vertices = np.empty((self.vertexCount, 4))
+      self.transformInstances(None, self._vertices)
+    return self._vertices
+
+  def transformInstances(self, matrix: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Transform every instance by `matrix @ modelMatrix` into a packed (V, 4) array
+
+    The combined matrices of a group are built as one stacked product and
+    applied to the shared base mesh, writing straight into the group's slice
+    of `out`. Nothing is allocated per call. Pass matrix=None for world space.
+    """
+    for group in self.groups:
+      if matrix is None:
+        matrices = group.modelMatrices
+      else:
+        matrices = np.matmul(matrix, group.modelMatrices, out=group.combinedMatrices)
+      block = out[group.start:group.stop].reshape(group.instanceCount, group.vertexCount, 4)
+      transformation.transformInstances(group.mesh.vertices, matrices, out=block)
+    return out
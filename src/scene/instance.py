@@ -0,0 +1,41 @@
+import transformation
+import numpy as np
+
+class Instance:
+  """One placement of a shared base mesh in the scene
+
+  The geometry (vertices and topology) lives once in `mesh`, which is shared
+  by every instance of the same primitive shape and parameters. An instance
+  only stores its own 4x4 model matrix.
+  """
+
+  def __init__(self, mesh, modelMatrix: np.ndarray):
+    self.mesh = mesh
+    self.modelMatrix = np.asarray(modelMatrix, dtype=np.float64)
+
+  @property
+  def vertices(self) -> np.ndarray:
+    """World-space vertices, computed on demand from the shared mesh"""
+    return transformation.transformVertices(self.mesh.vertices, self.modelMatrix)
+
+  def getFaces(self):
+    return self.mesh.getFaces()
+
+  def getEdges(self):
+    return self.mesh.getEdges()
+
+  def getMeshKey(self) -> tuple:
+    return self.mesh.getMeshKey()
+
+  def getTopologyKey(self) -> tuple:
+    return self.mesh.getTopologyKey()
+
+  def makeCopy(self):
+    """Create a copy that shares the mesh but owns its model matrix"""
+    return Instance(self.mesh, self.modelMatrix.copy())
+
+  def __getattr__(self, name: str):
+    # Shape parameters (sizes, segments, radius, ...) come from the mesh
+    if name == "mesh":
+      raise AttributeError(name)
+    return getattr(self.mesh, name)
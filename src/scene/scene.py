@@ -3,30 +3,41 @@ from scene.Pyramid import Pyramid
 from scene.Prism import Prism
 from scene.Cylinder import Cylinder
 from scene.Octahedron import Octahedron
+from scene.buffers import SceneBuffers
+from scene.instance import Instance
 import transformation
+import itertools
 from typing import Union, Any
 
 # Define a type for all supported objects
 SceneObject = Union[Cuboid, Pyramid, Prism, Cylinder, Octahedron]
 
 class Scene:
+  # Generations are unique across all scenes, so a version never matches a different scene
+  _generations = itertools.count(1)
+
   def __init__(self):
-    self.objects = []
-    self.defualtEdgesInCuboid = [
-      (0, 1), (1, 3), (3, 2), (2, 0),
-      (4, 5), (5, 7), (7, 6), (6, 4),
-      (0, 4), (1, 5), (2, 6), (3, 7)
-    ]
+    self.objects = []   # Instances, in insertion order
+    self.meshes = {}    # Mesh key -> base mesh shared by all instances of that shape
+    self.version = next(Scene._generations)  # Bumped whenever the geometry changes
+    self.buffers = None  # Packed buffers, rebuilt lazily after the version changes
+    self.buffersVersion = None
 
-  def addObject(self, object: SceneObject, position: tuple[float, float, float], rotation: tuple[float, float, float], scale: tuple[float, float, float]): 
+  def addObject(self, object: SceneObject, position: tuple[float, float, float], rotation: tuple[float, float, float], scale: tuple[float, float, float]) -> Instance:
     modelMatrix = self.createModelMatrix(position, rotation, scale)
     
-    # Create a copy of the object based on its type
-    objectCopy = self._createObjectCopy(object)
+    # Reuse the base mesh of an identical shape, copy the object only the first time
+    meshKey = object.getMeshKey()
+    mesh = self.meshes.get(meshKey)
+    if mesh is None:
+      mesh = self._createObjectCopy(object)
+      self.meshes[meshKey] = mesh
     
-    # Apply transformation
-    objectCopy.transformVertices(modelMatrix)
-    self.objects.append(objectCopy)
+    # The transformation stays a per-instance model matrix instead of being baked into vertices
+    instance = Instance(mesh, modelMatrix)
+    self.objects.append(instance)
+    self.version = next(Scene._generations)
+    return instance
 
   def _createObjectCopy(self, object: SceneObject) -> SceneObject:
     """Create a copy of the object based on its type"""
@@ -45,10 +56,21 @@ class Scene:
 
   def removeObject(self, object: Any):
     self.objects.remove(object)
+    # Forget the base mesh once its last instance is gone
+    if not any(other.mesh is object.mesh for other in self.objects):
+      self.meshes.pop(object.getMeshKey(), None)
+    self.version = next(Scene._generations)
 
   def getObjects(self) -> list:
     return self.objects
 
+  def getBuffers(self) -> SceneBuffers:
+    """Returns the packed vertex/face/edge buffers of all objects in the scene"""
+    if self.buffersVersion != self.version:
+      self.buffers = SceneBuffers(self.objects)
+      self.buffersVersion = self.version
+    return self.buffers
+
   def createModelMatrix(self, position: tuple[float, float, float], rotation: tuple[float, float, float], scale: tuple[float, float, float]) -> list[float]:
     """Creates a model matrix for object transformation"""
     modelMatrix = transformation.getDefaultMatrix()
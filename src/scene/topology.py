@@ -0,0 +1,101 @@
+import numpy as np
+
+class EdgeTable:
+  """Wireframe topology shared by every mesh of one primitive type and segment count
+
+  `edges` holds each undirected edge once, as an (E, 2) array of local vertex
+  indices. The edges are also covered by polylines ("strips") so they can be
+  drawn with few draw calls: strip `s` visits the vertices
+  `strips[stripOffsets[s]:stripOffsets[s] + stripSizes[s]]`, and its
+  consecutive vertex pairs are the edges listed in the same slice of
+  `stripEdges` (one shorter per strip, see `stripEdgeOffsets`).
+  """
+
+  def __init__(self, edges: list[tuple[int, int]]):
+    self.edges = self._deduplicate(edges)
+    strips, stripEdges = self._buildStrips(self.edges)
+
+    self.stripSizes = np.array([len(strip) for strip in strips], dtype=np.int64)
+    self.stripOffsets = np.concatenate(([0], np.cumsum(self.stripSizes)[:-1])).astype(np.int64)
+    self.strips = np.array([index for strip in strips for index in strip], dtype=np.int64)
+    self.stripEdges = np.array([edge for edgesOfStrip in stripEdges for edge in edgesOfStrip], dtype=np.int64)
+    self.stripEdgeOffsets = self.stripOffsets - np.arange(len(strips))
+
+  @staticmethod
+  def _deduplicate(edges: list[tuple[int, int]]) -> np.ndarray:
+    """Drop repeated edges (in either direction) and degenerate ones, keeping first-seen order"""
+    edges = np.sort(np.array(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    _, first = np.unique(edges, axis=0, return_index=True)
+    return edges[np.sort(first)]
+
+  @staticmethod
+  def _buildStrips(edges: np.ndarray) -> tuple[list[list[int]], list[list[int]]]:
+    """Greedily cover the edges with polylines, starting walks from odd-degree vertices first"""
+    adjacency = {}
+    for edgeIndex, (a, b) in enumerate(edges.tolist()):
+      adjacency.setdefault(a, []).append((b, edgeIndex))
+      adjacency.setdefault(b, []).append((a, edgeIndex))
+
+    used = np.zeros(len(edges), dtype=bool)
+    remaining = {vertex: len(neighbours) for vertex, neighbours in adjacency.items()}
+    strips, stripEdges = [], []
+    while True:
+      # A walk from an odd vertex ends at another odd vertex, which minimizes the strip count
+      starts = [v for v, degree in remaining.items() if degree > 0]
+      if not starts:
+        break
+      oddStarts = [v for v in starts if remaining[v] % 2 == 1]
+      vertex = (oddStarts or starts)[0]
+
+      strip, stripEdgeList = [vertex], []
+      while remaining[vertex] > 0:
+        for neighbour, edgeIndex in adjacency[vertex]:
+          if not used[edgeIndex]:
+            break
+        used[edgeIndex] = True
+        remaining[vertex] -= 1
+        remaining[neighbour] -= 1
+        strip.append(neighbour)
+        stripEdgeList.append(edgeIndex)
+        vertex = neighbour
+      strips.append(strip)
+      stripEdges.append(stripEdgeList)
+    return strips, stripEdges
+
+class FaceTopology:
+  """Face layout shared by every mesh of one primitive type and segment count
+
+  `indices` holds the local vertex indices of all faces back to back: face `f`
+  is `indices[offsets[f]:offsets[f] + sizes[f]]`, in the order of getFaces().
+  """
+
+  def __init__(self, faces: list[list[int]]):
+    self.sizes = np.array([len(face) for face in faces], dtype=np.int64)
+    self.offsets = np.concatenate(([0], np.cumsum(self.sizes)[:-1])).astype(np.int64)
+    self.indices = np.array([index for face in faces for index in face], dtype=np.int64)
+    self.faceCount = len(faces)
+
+# Edge tables are computed once per topology key (primitive type and segment count)
+_edgeTables = {}
+
+def getEdgeTable(mesh) -> EdgeTable:
+  """Returns the cached edge table of a primitive's topology"""
+  key = mesh.getTopologyKey()
+  table = _edgeTables.get(key)
+  if table is None:
+    table = EdgeTable(mesh.getEdges())
+    _edgeTables[key] = table
+  return table
+
+# Face tables likewise, under the same key
+_faceTopologies = {}
+
+def getFaceTopology(mesh) -> FaceTopology:
+  """Returns the cached face layout of a primitive's topology"""
+  key = mesh.getTopologyKey()
+  topology = _faceTopologies.get(key)
+  if topology is None:
+    topology = FaceTopology(mesh.getFaces())
+    _faceTopologies[key] = topology
+  return topology
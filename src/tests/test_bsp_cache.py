@@ -0,0 +1,105 @@
+import os
+import numpy as np
+import pytest
+from render import bsp_cache
+from render.painter_bsp import PainterBSP
+from scene.scene import Scene
+from scene.Cuboid import Cuboid
+from scene.Pyramid import Pyramid
+
+CAMERA = np.array([0.3, 2.0, -3.0])
+
+def make_scene(shift: float = 0.0) -> list:
+    scene = Scene()
+    for x in range(-3, 3):
+        for z in range(3, 6):
+            shape = Cuboid((0.8, 0.8, 0.8), (0, 0, 0)) if (x + z) % 2 else Pyramid(0.8, 1.0, (0, 0, 0))
+            scene.addObject(shape, (x * 1.1 + shift, 0, z * 1.1), (0, 15 * x + 7 * z, 0), (0.9, 0.9, 0.9))
+    return scene.getObjects()
+
+def build(cache_dir, objects: list, **kwargs) -> PainterBSP:
+    painter = PainterBSP(cache_dir=None if cache_dir is None else str(cache_dir), **kwargs)
+    painter.build_bsp_tree(objects)
+    return painter
+
+def rendering_order(painter: PainterBSP) -> list:
+    """Polygons in painter order as (owning object index, vertices), comparable between trees"""
+    objects = {id(obj): i for i, obj in enumerate(painter.tree_objects)}
+    flat = painter.flat_tree
+    return [(objects[id(flat.faces[i].parent_object)], flat.faces[i].vertices.tolist())
+            for i in flat.traverse_back_to_front(CAMERA).tolist()]
+
+def cache_files(cache_dir) -> list:
+    return sorted(os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".bsp"))
+
+@pytest.mark.parametrize("two_level", [False, True])
+def test_cached_tree_round_trip(tmp_path, two_level):
+    objects = make_scene()
+    built = build(tmp_path, objects, two_level=two_level)
+    assert built.stats['disk_cache_hits'] == 0
+    assert len(cache_files(tmp_path)) == 1
+
+    loaded = build(tmp_path, objects, two_level=two_level)
+    assert loaded.stats['disk_cache_hits'] == 1
+    for name in ('total_faces', 'node_count', 'split_count', 'tree_depth'):
+        assert loaded.stats[name] == built.stats[name]
+    assert np.array_equal(loaded.flat_tree.planes, built.flat_tree.planes)
+    assert rendering_order(loaded) == rendering_order(built)
+
+@pytest.mark.parametrize("change", [
+    {'objects': make_scene(shift=0.5)},
+    {'strategy': "first"},
+    {'two_level': True},
+])
+def test_cache_key_changes_with_scene_and_parameters(tmp_path, change):
+    params = {'objects': make_scene(), 'strategy': "scored", 'two_level': False}
+    build(tmp_path, **params)
+    params.update(change)
+
+    changed = build(tmp_path, **params)
+    assert changed.stats['disk_cache_hits'] == 0
+    assert len(cache_files(tmp_path)) == 2
+    assert rendering_order(changed) == rendering_order(build(None, **params))
+
+def corrupt_arrays(path: str):
+    """Overwrite everything after the header with random bytes"""
+    size = os.path.getsize(path) - bsp_cache.HEADER.size
+    with open(path, "r+b") as file:
+        file.seek(bsp_cache.HEADER.size)
+        file.write(np.random.default_rng(3).integers(0, 256, size, dtype=np.uint8).tobytes())
+
+def truncate(path: str):
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) * 2 // 3)
+
+def clear_header(path: str):
+    with open(path, "r+b") as file:
+        file.write(b"\0" * bsp_cache.HEADER.size)
+
+@pytest.mark.parametrize("damage", [corrupt_arrays, truncate, clear_header])
+def test_damaged_cache_file_falls_back_to_rebuild(tmp_path, damage):
+    objects = make_scene()
+    built = build(tmp_path, objects)
+    path, = cache_files(tmp_path)
+    damage(path)
+
+    rebuilt = build(tmp_path, objects)
+    assert rebuilt.stats['disk_cache_hits'] == 0
+    assert rendering_order(rebuilt) == rendering_order(built)
+    # The rebuild replaced the damaged file
+    assert build(tmp_path, objects).stats['disk_cache_hits'] == 1
+
+def test_cache_keeps_most_recently_used_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(bsp_cache, "MAX_ENTRIES", 2)
+    scenes = [make_scene(shift) for shift in (0.0, 0.5, 1.0)]
+    build(tmp_path, scenes[0])
+    first, = cache_files(tmp_path)
+    build(tmp_path, scenes[1])
+    # The first tree is the oldest until it is loaded again
+    os.utime(first, (0, 0))
+    assert build(tmp_path, scenes[0]).stats['disk_cache_hits'] == 1
+    build(tmp_path, scenes[2])
+
+    assert len(cache_files(tmp_path)) == 2
+    assert first in cache_files(tmp_path)
+    assert build(tmp_path, scenes[1]).stats['disk_cache_hits'] == 0
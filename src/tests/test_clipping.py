@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from render.clipping import clipEdges
+
+def clip(segments: list, fullFrustum: bool = False):
+  """Clip (start, end) pairs of clip-space points given as separate vertices"""
+  vertices = np.array([point for segment in segments for point in segment], dtype=np.float64)
+  edges = np.arange(len(vertices)).reshape(-1, 2)
+  return clipEdges(vertices, edges, fullFrustum)
+
+@pytest.mark.parametrize("fullFrustum", [False, True])
+def test_edges_inside_are_kept_exactly(fullFrustum):
+  segments = [([0, 0, 0, 1], [0.5, -0.5, 0.9, 1]), ([-1.5, 1.5, -1.5, 2], [1.9, 0, 1.9, 2])]
+  starts, ends, visible, clipped = clip(segments, fullFrustum)
+
+  assert visible.all() and not clipped.any()
+  assert np.array_equal(starts, [start for start, _ in segments])
+  assert np.array_equal(ends, [end for _, end in segments])
+
+def test_edges_outside_are_dropped():
+  # Behind the near plane, beyond the right plane, and past the top right corner without touching the frustum
+  segments = [([0, 0, -2, 1], [1, 0, -3, 1]), ([2, 0, 0, 1], [3, 0.5, 0, 1]), ([0.5, 2, 0, 1], [2, 0.5, 0, 1])]
+  _, _, visible, _ = clip(segments, fullFrustum=True)
+  assert not visible.any()
+
+  # Only the near plane clips by default
+  _, _, visible, clipped = clip(segments)
+  assert visible.tolist() == [False, True, True]
+  assert not clipped.any()
+
+def test_edges_crossing_the_near_plane_end_on_it():
+  segments = [([0, 0, -3, 1], [0, 0, 1, 1]), ([1, 2, 0, 2], [1, 2, -4, 2])]
+  starts, ends, visible, clipped = clip(segments)
+
+  assert visible.all() and clipped.all()
+  assert np.allclose(starts, [[0, 0, -1, 1], [1, 2, 0, 2]])
+  assert np.allclose(ends, [[0, 0, 1, 1], [1, 2, -2, 2]])
+
+def test_edges_crossing_side_planes_end_on_them():
+  segments = [([0, 0, 0, 1], [3, 0, 0, 1]), ([-3, 0.5, 0, 1], [3, 0.5, 0, 1]), ([0, -4, 0, 2], [0, 0, 0, 2])]
+  starts, ends, visible, clipped = clip(segments, fullFrustum=True)
+
+  assert visible.all() and clipped.all()
+  assert np.allclose(starts, [[0, 0, 0, 1], [-1, 0.5, 0, 1], [0, -2, 0, 2]])
+  assert np.allclose(ends, [[1, 0, 0, 1], [1, 0.5, 0, 1], [0, 0, 0, 2]])
+  # Untouched endpoints keep their exact vertices
+  assert np.array_equal(starts[0], [0, 0, 0, 1]) and np.array_equal(ends[2], [0, 0, 0, 2])
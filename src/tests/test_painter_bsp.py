@@ -0,0 +1,394 @@
+import numpy as np
+import pytest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import render.painter_bsp as painter_bsp
+from scene.scene import Scene
+from scene.buffers import SceneBuffers
+from scene.Cuboid import Cuboid
+from scene.Pyramid import Pyramid
+from scene.Cylinder import Cylinder
+from render.painter_bsp import BSPTree, FaceTable, FlatBSPTree, EPSILON, extract_faces, split_face
+from render.clipping import getFrustumPlanes
+from camera.camera import Camera
+
+CAMERA = np.array([0.3, 2.0, -3.0])
+
+def grid_scene(size: int = 6) -> list:
+    """A grid of rotated cuboids, pyramids and cylinders, close enough to need splits"""
+    scene = Scene()
+    for x in range(-size, size):
+        for z in range(3, 3 + size):
+            kind = (x + z) % 3
+            if kind == 0:
+                shape = Cuboid((0.8, 0.8, 0.8), (0, 0, 0))
+            elif kind == 1:
+                shape = Pyramid(0.8, 1.0, (0, 0, 0))
+            else:
+                shape = Cylinder(0.4, 1.0, 8, (0, 0, 0))
+            scene.addObject(shape, (x * 1.1, 0, z * 1.1), (0, 15 * x + 7 * z, 0), (0.9, 0.9, 0.9))
+    return scene.getObjects()
+
+def build(objects: list, workers: int = 0, two_level: bool = False) -> BSPTree:
+    # A low threshold sends subtrees of this small scene to the workers
+    tree = BSPTree("scored", workers=workers, parallel_threshold=8)
+    if two_level:
+        tree.create_two_level(objects)
+    else:
+        tree.create_from_objects(objects)
+    return tree
+
+def rendering_order(tree: BSPTree) -> list:
+    return FlatBSPTree.from_tree(tree.root).traverse_back_to_front(CAMERA).tolist()
+
+def test_updated_order_matches_fresh_traversal():
+    root = build(grid_scene()).root
+    flat = FlatBSPTree.from_tree(root)
+    updates = set()
+    for x in np.linspace(-4.0, 4.0, 25):
+        camera = np.array([x, 1.5, 0.5 * x])
+        order = flat.traverse_back_to_front(camera)
+        updates.add(flat.last_update)
+        assert order.tolist() == FlatBSPTree.from_tree(root).traverse_back_to_front(camera).tolist()
+    assert 'partial' in updates
+
+class FailingPool:
+    """Stands in for ProcessPoolExecutor: runs the first task inline, then breaks"""
+    
+    def __init__(self, max_workers=None):
+        self.submitted = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def submit(self, fn, *args):
+        future = Future()
+        if self.submitted == 0:
+            future.set_result(fn(*args))
+        else:
+            future.set_exception(BrokenProcessPool("worker died"))
+        self.submitted += 1
+        return future
+
+def test_parallel_build_matches_serial():
+    objects = grid_scene()
+    serial = build(objects)
+    parallel = build(objects, workers=2)
+    
+    assert parallel.node_count == serial.node_count
+    assert parallel.split_count == serial.split_count
+    assert rendering_order(parallel) == rendering_order(serial)
+
+def test_broken_pool_falls_back_to_serial_build(monkeypatch):
+    objects = grid_scene()
+    serial = build(objects)
+    monkeypatch.setattr(painter_bsp, "ProcessPoolExecutor", FailingPool)
+    fallback = build(objects, workers=2)
+    
+    assert fallback.node_count == serial.node_count
+    assert fallback.split_count == serial.split_count
+    assert rendering_order(fallback) == rendering_order(serial)
+
+def outside_frustum(face, planes: np.ndarray) -> bool:
+    """Brute force: a face is outside when all of its vertices are behind one plane"""
+    distances = face.vertices[:, :3] @ planes[:, :3].T + planes[:, 3]
+    return bool(np.any(np.all(distances < 0, axis=0)))
+
+@pytest.mark.parametrize("fov", [40, 90])
+def test_cull_drops_only_faces_outside_frustum(fov):
+    flat = FlatBSPTree.from_tree(build(grid_scene()).root)
+    camera = Camera(640, 480, fov, 100, 0.1)
+    camera.translate((-1.5, 1.0, 1.0))
+    camera.rotate((0, 20, 0))
+    planes = getFrustumPlanes(-camera.getViewProjectionMatrix())[:5]
+    order = flat.traverse_back_to_front(camera.position).tolist()
+    
+    culled = flat.cull(np.array(order), planes).tolist()
+    kept = set(culled)
+    assert 0 < len(culled) < len(order)
+    # Painter order is kept, and every face left out is outside the frustum
+    assert culled == [i for i in order if i in kept]
+    assert all(outside_frustum(flat.faces[i], planes) for i in order if i not in kept)
+
+@pytest.mark.parametrize("two_level", [False, True])
+def test_parallel_build_matches_single_worker(two_level):
+    objects = grid_scene()
+    single = build(objects, workers=1, two_level=two_level)
+    parallel = build(objects, workers=2, two_level=two_level)
+    
+    assert parallel.node_count == single.node_count
+    assert parallel.split_count == single.split_count
+    assert rendering_order(parallel) == rendering_order(single)
+
+def brute_force_groups(boxes: list) -> set:
+    """Connected sets of objects whose boxes overlap by more than touching"""
+    groups = [{i} for i in range(len(boxes))]
+    for i, (low_i, high_i) in enumerate(boxes):
+        for j, (low_j, high_j) in enumerate(boxes[:i]):
+            if np.all(low_i < high_j - painter_bsp.EPSILON) and np.all(low_j < high_i - painter_bsp.EPSILON):
+                group_i = next(group for group in groups if i in group)
+                group_j = next(group for group in groups if j in group)
+                if group_i is not group_j:
+                    groups.remove(group_j)
+                    group_i |= group_j
+    return {frozenset(group) for group in groups}
+
+@pytest.mark.parametrize("sweep_pairs", [painter_bsp.SWEEP_PAIRS, 5])
+def test_overlap_groups_match_brute_force(monkeypatch, sweep_pairs):
+    # Few candidate pairs per block also exercise the blocked sweep
+    monkeypatch.setattr(painter_bsp, "SWEEP_PAIRS", sweep_pairs)
+    rng = np.random.default_rng(7)
+    scene = Scene()
+    for _ in range(60):
+        scene.addObject(Cuboid((1, 1, 1), (0, 0, 0)), tuple(rng.uniform(0, 8, 3)), (0, rng.uniform(0, 90), 0), (1, 1, 1))
+    boxes = []
+    for obj in scene.getObjects():
+        vertices = np.asarray(obj.vertices)[:, :3]
+        boxes.append((vertices.min(axis=0), vertices.max(axis=0)))
+    
+    groups = BSPTree._overlap_groups(boxes)
+    expected = brute_force_groups(boxes)
+    assert 1 < len(expected) < len(boxes)
+    assert {frozenset(indices) for indices, _, _ in groups} == expected
+    for indices, low, high in groups:
+        assert np.array_equal(low, np.min([boxes[i][0] for i in indices], axis=0))
+        assert np.array_equal(high, np.max([boxes[i][1] for i in indices], axis=0))
+
+def test_faces_from_scene_buffers_match_transformed_objects():
+    objects = grid_scene()
+    buffers = SceneBuffers(objects)
+    for selection in (objects, objects[::-5]):
+        transformed = extract_faces(selection)
+        packed = extract_faces(selection, buffers=buffers)
+        
+        assert len(packed) == len(transformed)
+        for a, b in zip(transformed, packed):
+            assert a.parent_object is b.parent_object
+            assert a.color == b.color
+            assert np.array_equal(a.vertices, b.vertices)
+    
+    tree = BSPTree("scored")
+    tree.create_two_level(objects, buffers=buffers)
+    assert rendering_order(tree) == rendering_order(build(objects, two_level=True))
+
+def polygon_nodes(tree: BSPTree) -> int:
+    return int(np.count_nonzero(FlatBSPTree.from_tree(tree.root).polygons >= 0))
+
+@pytest.mark.parametrize("workers, two_level", [(0, False), (0, True), (2, False), (2, True)])
+def test_face_count_is_number_of_polygon_nodes(workers, two_level):
+    tree = build(grid_scene(), workers=workers, two_level=two_level)
+    assert tree.face_count == polygon_nodes(tree)
+    assert tree.node_count == FlatBSPTree.from_tree(tree.root).node_count
+
+def cast_rays(flat: FlatBSPTree, order: list, camera: np.ndarray, targets: np.ndarray) -> tuple:
+    """
+    Cast rays from the camera through the targets and return, for each, the
+    index of the face painted last in `order` and of the nearest face hit
+    (None where a ray hits nothing)
+    """
+    directions = targets - camera
+    painted = [None] * len(directions)
+    nearest = [None] * len(directions)
+    distances = np.full(len(directions), np.inf)
+    for i in order:
+        face = flat.faces[i]
+        normal, offset = face.plane[:3], face.plane[3]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = -(normal @ camera + offset) / (directions @ normal)
+        points = camera + t[:, None] * directions
+        vertices = face.vertices[:, :3]
+        edges = np.roll(vertices, -1, axis=0) - vertices
+        sides = np.cross(edges[None], points[:, None] - vertices[None]) @ normal
+        hits = (t > 0) & (np.all(sides > 1e-9, axis=1) | np.all(sides < -1e-9, axis=1))
+        for ray in np.flatnonzero(hits).tolist():
+            painted[ray] = i
+            if t[ray] < distances[ray]:
+                distances[ray] = t[ray]
+                nearest[ray] = i
+    return painted, nearest
+
+def visible_objects(tree: BSPTree, camera: np.ndarray) -> tuple:
+    """The object painted last and the nearest object hit along rays through the grid scene"""
+    targets = np.stack(np.meshgrid(np.linspace(-7, 6, 40), np.linspace(-0.6, 0.6, 5), [6.0]), axis=-1).reshape(-1, 3)
+    flat = FlatBSPTree.from_tree(tree.root)
+    painted, nearest = cast_rays(flat, flat.traverse_back_to_front(camera).tolist(), camera, targets)
+    owner = lambda i: None if i is None else id(flat.faces[i].parent_object)
+    return [owner(i) for i in painted], [owner(i) for i in nearest]
+
+def test_insert_then_remove_matches_rebuild():
+    objects = grid_scene()
+    added = objects[20:26]
+    rest = [obj for obj in objects if obj not in added]
+    tree = build(rest)
+    tree.insert_objects(added)
+    
+    assert tree.inserted_nodes > 0
+    assert tree.face_count == polygon_nodes(tree)
+    # The updated tree paints every ray like a tree rebuilt with the new objects
+    painted, nearest = visible_objects(tree, CAMERA)
+    assert painted == nearest
+    assert painted == visible_objects(build(objects), CAMERA)[0]
+    assert sum(ray in {id(obj) for obj in added} for ray in painted) > 0
+    
+    tree.remove_objects(added)
+    fresh = build(rest)
+    assert (tree.face_count, tree.node_count) == (fresh.face_count, fresh.node_count)
+    assert FlatBSPTree.from_tree(tree.root).depth() == FlatBSPTree.from_tree(fresh.root).depth()
+    assert tree.degradation() == 0
+    assert rendering_order(tree) == rendering_order(fresh)
+
+def test_removed_objects_leave_no_fragments():
+    objects = grid_scene()
+    removed = objects[::4]
+    rest = [obj for obj in objects if obj not in removed]
+    tree = build(objects)
+    tree.remove_objects(removed)
+    flat = FlatBSPTree.from_tree(tree.root)
+    
+    removed_ids = {id(obj) for obj in removed}
+    parents = {id(flat.faces[i].parent_object) for i in flat.traverse_back_to_front(CAMERA).tolist()}
+    assert parents == {id(obj) for obj in rest}
+    assert not any(id(face.parent_object) in removed_ids for face in flat.faces)
+    # Nodes left without a polygon are exactly the pruned ones that still order two children
+    bare = np.flatnonzero(flat.polygons < 0)
+    assert len(bare) == tree.pruned_nodes > 0
+    assert np.all((flat.front[bare] >= 0) & (flat.back[bare] >= 0))
+    assert tree.node_count == flat.node_count
+    assert tree.face_count == polygon_nodes(tree)
+    painted, nearest = visible_objects(tree, CAMERA)
+    assert painted == nearest == visible_objects(build(rest), CAMERA)[0]
+
+def test_degraded_tree_is_rebuilt():
+    objects = grid_scene()
+    painter = painter_bsp.PainterBSP(workers=0, two_level=False, rebalance_threshold=0.3)
+    painter.build_bsp_tree(objects[:30], 1)
+    painter.build_bsp_tree(objects[:32], 2)
+    assert painter.stats['incremental_updates'] == 1
+    assert painter.stats['rebalances'] == 0
+    assert 0 < painter.bsp_tree.degradation() <= 0.3
+    
+    # Adding most of the scene at once degrades the tree past the threshold
+    painter.build_bsp_tree(objects, 3)
+    assert painter.stats['incremental_updates'] == 1
+    assert painter.stats['rebalances'] == 1
+    assert painter.bsp_tree.degradation() == 0
+    fresh = build(objects)
+    assert painter.stats['total_faces'] == fresh.face_count == polygon_nodes(painter.bsp_tree)
+    assert painter.stats['node_count'] == fresh.node_count
+
+def per_vertex_split(plane: np.ndarray, vertices: np.ndarray) -> tuple:
+    """The original vertex-by-vertex Face.split_polygon, as (front, back) vertex arrays or None"""
+    distances = [np.dot(plane[:3], vertex[:3]) + plane[3] for vertex in vertices]
+    classes = [0 if abs(d) < EPSILON else (1 if d > 0 else -1) for d in distances]
+    if all(c >= 0 for c in classes):
+        return vertices, None
+    elif all(c <= 0 for c in classes):
+        return None, vertices
+    
+    front_vertices = []
+    back_vertices = []
+    for i, current in enumerate(vertices):
+        next_index = (i + 1) % len(vertices)
+        if classes[i] >= 0:
+            front_vertices.append(current)
+        if classes[i] <= 0:
+            back_vertices.append(current)
+        if classes[i] == 0 or classes[next_index] == 0 or classes[i] == classes[next_index]:
+            continue
+        t = distances[i] / (distances[i] - distances[next_index])
+        intersection = np.append(current[:3] + t * (vertices[next_index][:3] - current[:3]), 1.0)
+        front_vertices.append(intersection)
+        back_vertices.append(intersection)
+    return (np.array(front_vertices) if len(front_vertices) >= 3 else None,
+            np.array(back_vertices) if len(back_vertices) >= 3 else None)
+
+def square(heights: list) -> np.ndarray:
+    """Unit square in x/y with its four corners lifted to the given z"""
+    return np.array([[0, 0, heights[0], 1], [1, 0, heights[1], 1],
+                     [1, 1, heights[2], 1], [0, 1, heights[3], 1]], dtype=np.float64)
+
+# Heights of the square's corners against the plane z = 0
+SPLIT_CASES = {
+    'coplanar': [0, 0, 0, 0],
+    'coplanar within epsilon': [0.5 * EPSILON, -0.5 * EPSILON, 0.99 * EPSILON, -0.99 * EPSILON],
+    'edge touching, front': [0, 0, 1, 1],
+    'edge touching, back': [0, 0, -1, -1],
+    'edge within epsilon, back': [0.5 * EPSILON, -0.5 * EPSILON, -1, -1],
+    'corner touching': [0, 1, 2, 1],
+    'exactly epsilon behind': [-EPSILON, 1, 1, 1],
+    'exactly epsilon in front': [EPSILON, -1, -1, -1],
+    'just past epsilon': [-1.01 * EPSILON, 1, 1, 1],
+    'straddling': [-1, -1, 1, 1],
+    'straddling through corners': [-1, 0, 1, 0],
+    'straddling through a corner': [-1, 0.5 * EPSILON, 1, 1],
+    'straddling diagonally': [-1, 2, 4, 1],
+}
+
+@pytest.mark.parametrize("heights", SPLIT_CASES.values(), ids=SPLIT_CASES.keys())
+def test_split_face_matches_per_vertex_split(heights):
+    vertices = square(heights)
+    table = FaceTable()
+    face, = table.add_faces(np.arange(4) + table.pool.append(vertices), np.array([4]), [(1, 2, 3)], [None])
+    plane = np.array([0.0, 0.0, 1.0, 0.0])
+    
+    for part, expected in zip(split_face(plane, face), per_vertex_split(plane, vertices)):
+        if expected is None:
+            assert part is None
+        elif expected is vertices:
+            assert part is face
+        else:
+            assert part is not face and part.color == (1, 2, 3)
+            assert np.allclose(part.vertices, expected, rtol=0, atol=1e-12)
+
+def test_split_face_matches_per_vertex_split_on_random_planes():
+    rng = np.random.default_rng(11)
+    faces = extract_faces(grid_scene(2))
+    split = 0
+    for _ in range(200):
+        plane = np.append(rng.normal(size=3), 0.0)
+        plane[:3] /= np.linalg.norm(plane[:3])
+        face = faces[rng.integers(len(faces))]
+        plane[3] = -plane[:3] @ face.vertices[rng.integers(len(face.vertices)), :3] + rng.uniform(-0.3, 0.3)
+        vertices = face.vertices.copy()
+        parts = split_face(plane, face)
+        for part, expected in zip(parts, per_vertex_split(plane, vertices)):
+            if expected is None:
+                assert part is None
+            else:
+                assert np.allclose(part.vertices, expected, rtol=0, atol=1e-12)
+        split += face not in parts
+    assert split > 20
+
+@pytest.mark.parametrize("shape", [Cuboid((1, 1.5, 2), (0, 0, 0)), Cylinder(0.8, 1.5, 12, (0, 0, 0))],
+                         ids=["cuboid", "cylinder"])
+def test_back_face_culling_keeps_visible_faces_of_closed_object(shape):
+    scene = Scene()
+    scene.addObject(shape, (0, 0, 5), (10, 35, 0), (1, 1, 1))
+    flat = FlatBSPTree.from_tree(build(scene.getObjects()).root)
+    center = np.array([0.0, 0.0, 5.0])
+    offsets = np.stack(np.meshgrid(np.linspace(-1.5, 1.5, 25), np.linspace(-1.5, 1.5, 25)), axis=-1).reshape(-1, 2)
+    
+    for camera in ([0.0, 0.5, 0.0], [4.0, 3.0, 6.0], [-2.0, -4.0, 9.0]):
+        camera = np.array(camera)
+        order = flat.traverse_back_to_front(camera)
+        kept = flat.cull_back_faces(order)
+        assert 0 < flat.back_face_count < len(order)
+        
+        # Rays through a grid around the object, across the view direction
+        view = (center - camera) / np.linalg.norm(center - camera)
+        right = np.cross(view, [0.0, 1.0, 0.0])
+        right /= np.linalg.norm(right)
+        up = np.cross(right, view)
+        targets = center + offsets[:, :1] * right + offsets[:, 1:] * up
+        painted, nearest = cast_rays(flat, order.tolist(), camera, targets)
+        culled_painted, _ = cast_rays(flat, kept.tolist(), camera, targets)
+        assert painted == nearest
+        assert culled_painted == painted
+        assert sum(i is not None for i in painted) > len(targets) // 4
+    
+    # From inside, the closed object has no face towards the camera and is kept whole
+    order = flat.traverse_back_to_front(center + 0.1)
+    assert flat.cull_back_faces(order).tolist() == order.tolist()
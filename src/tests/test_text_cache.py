@@ -0,0 +1,31 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pytest
+from render.text_cache import TextCache
+
+WHITE = (255, 255, 255)
+
+@pytest.fixture
+def cache():
+    pygame.font.init()
+    return TextCache(pygame.font.Font(None, 16))
+
+def test_non_ascii_digits_are_rendered_whole(cache):
+    # str.isdigit accepts these, the glyph atlas does not hold them
+    for text in ("x²", "٣", "area m² 12.5"):
+        surface = cache.render(text, WHITE)
+        assert surface.get_height() == cache.font.get_height()
+        assert surface.get_width() > 0
+
+def test_numbers_reuse_cached_text_runs(cache):
+    first = cache.render("FPS: 60", WHITE)
+    misses = cache.misses
+    second = cache.render("FPS: 59", WHITE)
+    
+    # Only the new string misses; "FPS: " comes from the cache and the digits from the atlas
+    assert cache.misses == misses + 1
+    assert second.get_height() == first.get_height()
+    assert cache.render("FPS: 60", WHITE) is first
@@ -86,6 +86,40 @@ def getViewMatrix(position: np.ndarray, rotation: np.ndarray) -> list[float]:
     # View matrix = R * T (first translate world, then rotate it)
     return R @ T
 
+def transformVertices(vertices: np.ndarray, matrix: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Apply a 4x4 matrix to a whole (N, 4) array of homogeneous vertices at once
+
+    Vertices are stored as rows, so this is the batched equivalent of
+    `matrix @ vertex` for every row. When `out` is given the result is
+    written into it (it must be a float (N, 4) array) and `out` is returned,
+    otherwise a new array is allocated.
+    """
+    return np.matmul(vertices, matrix.T, out=out)
+
+def transformInstances(vertices: np.ndarray, matrices: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Apply a stack of K 4x4 matrices to one shared (N, 4) vertex array
+
+    Returns a (K, N, 4) array where block k holds the vertices transformed by
+    matrices[k], computed as a single stacked matrix product. `out` may be a
+    preallocated (K, N, 4) float array.
+    """
+    return np.matmul(vertices, np.swapaxes(matrices, -1, -2), out=out)
+
+def getPerspectiveMatrix(fov: float, aspectRatio: float, near: float, far: float) -> np.ndarray:
+    """Creates a perspective projection matrix, fov in degrees"""
+    f = 1.0 / np.tan(np.radians(fov) / 2)
+
+    # Calculate projection matrix components for better depth handling
+    a = -(far + near) / (far - near)
+    b = -(2 * far * near) / (far - near)
+
+    return np.array([
+        [f / aspectRatio, 0, 0, 0],
+        [0, f, 0, 0],
+        [0, 0, a, b],
+        [0, 0, -1, 0]
+    ])
+
 # Translation X, Y, Z functions
 def translate(matrix: list[float], translationVector: tuple[float, float, float], isCamera: bool = False):
     """Apply translation to matrix. For camera transformations, set isCamera=True"""